@@ -0,0 +1,180 @@
+"""
+Measure FSM transitions per second of the table-driven state machine and the per-message classes it replaced.
+
+The legacy path is a copy of the old dispatch: make_action picked a class by status
+range, built a new action object for every message and walked its if/elif chain.
+Both paths run the same steps: start and title of task creation, the title step of a
+task update and a rejected user name, and write the state to the state store configured
+by STATE_STORE_URL. These steps touch no database (starting an update checks that the
+task exists, so the update flow is entered at its title step), and the numbers show
+dispatch and state handling cost of this process only.
+
+Usage (from the bot directory):
+    python -m benchmarks.fsm_transitions --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from database.models import User, StatesUserEnum
+from database.state import FSMState, state_store
+from todo.implementation import load_state, state_machine
+from todo.validators import is_valid_name
+
+TG_ID = -3
+
+
+class LegacyAction:
+    """Per-message action object of the old implementation, without the database writes these steps skip."""
+
+    def __init__(self, user: User, state: Optional[FSMState] = None) -> None:
+        self._user = user
+        self._state = state
+        self._text = None
+        self._required_save = False
+        self._message = ""
+        self._buttons = None
+        self._task = None
+        self._task_changes = {}
+        self.updated_task = None
+
+    async def continue_action(self, text):
+        if self._state is None:
+            self._state = await load_state(self._user)
+        self._text = text
+        return await self._fsm_strategy()
+
+    async def _save_models(self) -> bool:
+        if self._state.status == StatesUserEnum.FINISH:
+            await state_store.delete(self._user.tg_id)
+        else:
+            await state_store.set(self._user.tg_id, self._state)
+        return True
+
+
+class LegacyRegistrationUser(LegacyAction):
+
+    async def _fsm_strategy(self):
+        if self._state.status == StatesUserEnum.START:
+            self._state.status = StatesUserEnum.ENTER_NAME
+            self._message = "Введите имя пользователся"
+            self._required_save = True
+        elif self._state.status == StatesUserEnum.ENTER_NAME:
+            if is_valid_name(self._text):
+                self._state.data["name"] = self._text
+                self._state.status = StatesUserEnum.ENTER_LOGIN
+                self._message = "Введите имя логин"
+                self._required_save = True
+            else:
+                self._message = "Введенное имя не подходит"
+        else:
+            self._message = "Вы уже зарегистрированы"
+        if self._required_save and not await self._save_models():
+            raise Exception("Ошибка при сохранение")
+        return self._message, self._buttons
+
+
+class LegacyCreateTask(LegacyAction):
+
+    async def start_action(self):
+        self._state = FSMState(StatesUserEnum.CREATE_TASK_START)
+        return await self._fsm_strategy()
+
+    async def _fsm_strategy(self):
+        if self._state.status == StatesUserEnum.CREATE_TASK_START:
+            self._state.status = StatesUserEnum.CREATE_TASK_TITLE
+            self._message = "Введите название задачи"
+            self._required_save = True
+        elif self._state.status == StatesUserEnum.CREATE_TASK_TITLE:
+            self._state.data["title"] = self._text
+            self._message = "Введите описание задачи"
+            self._state.status = StatesUserEnum.CREATE_TASK_DESCRIPTION
+            self._required_save = True
+        if self._required_save and not await self._save_models():
+            raise Exception("Ошибка при сохранение")
+        return self._message, self._buttons
+
+
+class LegacyUpdateTask(LegacyAction):
+
+    async def _fsm_strategy(self):
+        self._required_save = True
+        if self._state.status == StatesUserEnum.UPDATE_TASK_START:
+            self._state.status = StatesUserEnum.UPDATE_TASK_TITLE
+            self._message = "Введите новое название задачи"
+        elif self._state.status == StatesUserEnum.UPDATE_TASK_TITLE:
+            self._state.data["title"] = self._text
+            self._message = "Введите новое описание задачи"
+            self._state.status = StatesUserEnum.UPDATE_TASK_DESCRIPTION
+        if self._required_save and not await self._save_models():
+            raise Exception("Ошибка при сохранение")
+        return self._message, self._buttons
+
+
+async def legacy_make_action(user: User, text: str):
+    """The old make_action dispatch by status range."""
+    state = await load_state(user)
+    if state.status == StatesUserEnum.FINISH:
+        return None
+    elif state.status < 10:
+        return await LegacyRegistrationUser(user, state).continue_action(text)
+    elif state.status < 20:
+        return await LegacyCreateTask(user, state).continue_action(text)
+    elif state.status < 30:
+        return await LegacyUpdateTask(user, state).continue_action(text)
+
+
+async def legacy_round(user: User) -> int:
+    await LegacyCreateTask(user).start_action()
+    await legacy_make_action(user, "title")
+    await state_store.set(user.tg_id, FSMState(StatesUserEnum.UPDATE_TASK_TITLE, task_id=1))
+    await legacy_make_action(user, "title")
+    await state_store.set(user.tg_id, FSMState(StatesUserEnum.ENTER_NAME))
+    await legacy_make_action(user, "/name")
+    return 4
+
+
+async def engine_round(user: User) -> int:
+    await state_machine.run(user, FSMState(StatesUserEnum.CREATE_TASK_START))
+    await state_machine.run(user, await load_state(user), "title")
+    await state_store.set(user.tg_id, FSMState(StatesUserEnum.UPDATE_TASK_TITLE, task_id=1))
+    await state_machine.run(user, await load_state(user), "title")
+    await state_store.set(user.tg_id, FSMState(StatesUserEnum.ENTER_NAME))
+    await state_machine.run(user, await load_state(user), "/name")
+    return 4
+
+
+async def measure(iterations: int, run_round: Callable[[User], Awaitable[int]], user: User) -> float:
+    """
+    Run the flows and return transitions per second of CPU time of this process.
+    """
+    await run_round(user)
+    transitions = 0
+    started = time.process_time()
+    for _ in range(iterations):
+        transitions += await run_round(user)
+    return transitions / (time.process_time() - started)
+
+
+async def main(iterations: int) -> List[str]:
+    user = User(id=-1, tg_id=TG_ID, name="bench", login="bench-fsm", status=StatesUserEnum.FINISH)
+    try:
+        before = await measure(iterations, legacy_round, user)
+        after = await measure(iterations, engine_round, user)
+    finally:
+        await state_store.delete(TG_ID)
+        await state_store.close()
+    return [
+        f"{'path':<8}{'transitions/s':>15}",
+        f"{'legacy':<8}{before:>15.0f}",
+        f"{'table':<8}{after:>15.0f}",
+        f"speedup {after / before:.2f}x",
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    arguments = parser.parse_args()
+    print("\n".join(asyncio.run(main(arguments.iterations))))
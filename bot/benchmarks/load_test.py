@@ -0,0 +1,224 @@
+"""
+Replay synthetic Telegram updates against the real handlers and report latency per flow.
+
+The benchmark registers the handlers of todo/handlers.py on the app, replaces the
+Telegram API with an in-process fake and dispatches synthetic Message and
+CallbackQuery objects the way Pyrogram's dispatcher does. Every simulated user runs
+registration once and then create, show, toggle and delete flows; users run
+concurrently while updates of one user are handled in order, as in production.
+The database configured by the DB_* variables is used; users and tasks created by
+the benchmark are deleted before and after the run.
+
+Usage (from the repository root, with bot on PYTHONPATH):
+    python -m benchmarks.load_test --users 200 --rounds 5
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pyrogram import ContinuePropagation, StopPropagation, types
+from pyrogram.enums import ChatType
+from pyrogram.handlers import CallbackQueryHandler, MessageHandler
+from sqlalchemy import delete, select
+
+from database.models import async_engine, async_session, Task, User
+from main.client import app
+from main.sender import SendScheduler
+from todo.buttons import CallbackOperation, decode_callback, encode_callback
+import todo.handlers  # noqa: F401  registers the handlers on the app
+
+TG_ID_BASE = 2_000_000_000
+
+
+class FakeTelegram:
+    """
+    In-process stand-in for the Telegram API methods called through the send scheduler.
+    """
+
+    def __init__(self) -> None:
+        self._message_ids = itertools.count(1)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.last_message: Dict[int, types.Message] = {}
+
+    async def send_message(self, chat_id: int, text: str, reply_markup=None, **kwargs) -> types.Message:
+        self.calls["send_message"] += 1
+        message = synthetic_message(chat_id, text, message_id=next(self._message_ids), reply_markup=reply_markup)
+        self.last_message[chat_id] = message
+        return message
+
+    async def edit_message_text(self, chat_id: int, message_id: int, text: str, reply_markup=None, **kwargs):
+        self.calls["edit_message_text"] += 1
+        message = synthetic_message(chat_id, text, message_id=message_id, reply_markup=reply_markup)
+        self.last_message[chat_id] = message
+        return message
+
+    async def edit_message_reply_markup(self, chat_id: int, message_id: int, reply_markup=None):
+        self.calls["edit_message_reply_markup"] += 1
+        message = self.last_message.get(chat_id)
+        if message is not None and message.id == message_id:
+            message.reply_markup = reply_markup
+        return message
+
+    async def answer_callback_query(self, callback_query_id: str, text: str = None, **kwargs) -> bool:
+        self.calls["answer_callback_query"] += 1
+        return True
+
+
+def synthetic_message(chat_id: int, text: str, message_id: int = 0, reply_markup=None) -> types.Message:
+    user = types.User(id=chat_id, is_bot=False, first_name=f"user{chat_id}")
+    chat = types.Chat(id=chat_id, type=ChatType.PRIVATE)
+    return types.Message(
+        id=message_id, from_user=user, chat=chat, date=datetime.now(), text=text,
+        reply_markup=reply_markup, client=app,
+    )
+
+
+def synthetic_callback(chat_id: int, data: str, message: types.Message) -> types.CallbackQuery:
+    user = types.User(id=chat_id, is_bot=False, first_name=f"user{chat_id}")
+    return types.CallbackQuery(
+        client=app, id=str(time.monotonic_ns()), from_user=user, chat_instance=str(chat_id),
+        message=message, data=data,
+    )
+
+
+async def dispatch(update) -> None:
+    """
+    Run the first matching handler of every group, like Pyrogram's dispatcher.
+    """
+    handler_type = CallbackQueryHandler if isinstance(update, types.CallbackQuery) else MessageHandler
+    for group in app.dispatcher.groups.values():
+        for handler in group:
+            if not isinstance(handler, handler_type) or not await handler.check(app, update):
+                continue
+            try:
+                await handler.callback(app, update)
+            except StopPropagation:
+                return
+            except ContinuePropagation:
+                continue
+            break
+
+
+class SimulatedUser:
+    """
+    User running the bot flows one update at a time and timing every flow.
+    """
+
+    def __init__(self, tg_id: int, telegram: FakeTelegram, timings: Dict[str, List[float]]) -> None:
+        self.tg_id = tg_id
+        self.telegram = telegram
+        self.timings = timings
+
+    async def send(self, text: str) -> None:
+        await dispatch(synthetic_message(self.tg_id, text))
+
+    async def press(self, data: str, message: types.Message) -> None:
+        await dispatch(synthetic_callback(self.tg_id, data, message))
+
+    async def flow(self, name: str, *steps) -> None:
+        started = time.perf_counter()
+        for step in steps:
+            await step
+        self.timings[name].append(time.perf_counter() - started)
+
+    async def run(self, rounds: int) -> None:
+        await self.flow(
+            "registration",
+            self.send("/start"),
+            self.send("/registration"),
+            self.send(f"User {self.tg_id}"),
+            self.send(f"login{self.tg_id}"),
+        )
+        for number in range(rounds):
+            await self.flow(
+                "create",
+                self.send("/create task"),
+                self.send(f"Task {number}"),
+                self.send(f"Description of task {number}"),
+            )
+            await self.flow("show", self.send("/show tasks"))
+            task_id = await self.first_task_id()
+            if task_id is None:
+                continue
+            message = self.telegram.last_message[self.tg_id]
+            await self.flow("toggle", self.press(encode_callback(CallbackOperation.COMPLETE_TASK, task_id), message))
+            await self.flow("delete", self.press(encode_callback(CallbackOperation.DELETE_TASK, task_id), message))
+
+    async def first_task_id(self) -> Optional[int]:
+        """
+        Wait for the task page to be "sent" and read the first task ID from its keyboard.
+        """
+        for _ in range(100):
+            message = self.telegram.last_message.get(self.tg_id)
+            markup = message.reply_markup if message else None
+            if isinstance(markup, types.InlineKeyboardMarkup):
+                for row in markup.inline_keyboard:
+                    for button in row:
+                        callback = decode_callback(button.callback_data)
+                        if callback is not None and callback[0] == CallbackOperation.COMPLETE_TASK:
+                            return callback[1]
+            await asyncio.sleep(0.001)
+        return None
+
+
+async def cleanup() -> None:
+    async with async_session() as session:
+        users = select(User.id).where(User.tg_id >= TG_ID_BASE)
+        await session.execute(delete(Task).where(Task.user_id.in_(users)))
+        await session.execute(delete(User).where(User.tg_id >= TG_ID_BASE))
+        await session.commit()
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(timings: Dict[str, List[float]], elapsed: float) -> List[str]:
+    lines = [f"{'flow':<14}{'count':>8}{'flows/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for name, values in timings.items():
+        ordered = sorted(values)
+        lines.append(
+            f"{name:<14}{len(ordered):>8}{len(ordered) / elapsed:>10.1f}"
+            + "".join(f"{percentile(ordered, q) * 1000:>10.2f}" for q in (0.5, 0.95, 0.99))
+            + f"{ordered[-1] * 1000:>10.2f}"
+        )
+    return lines
+
+
+async def main(users: int, rounds: int, concurrency: int) -> None:
+    await app.migrate_database()
+    app.me = types.User(id=1, is_bot=True, first_name="ToDo", username="todo_bot")
+    telegram = FakeTelegram()
+    app.sender = SendScheduler(telegram, global_rate=1e9, chat_rate=1e9, chat_burst=1e9)
+    await cleanup()
+    timings: Dict[str, List[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_user(tg_id: int) -> None:
+        async with semaphore:
+            await SimulatedUser(tg_id, telegram, timings).run(rounds)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_user(TG_ID_BASE + number) for number in range(users)))
+        elapsed = time.perf_counter() - started
+        await app.sender.stop()
+    finally:
+        await cleanup()
+        await async_engine.dispose()
+    print(f"users: {users}, rounds: {rounds}, concurrency: {concurrency}, elapsed: {elapsed:.2f} s")
+    print(f"telegram calls: {dict(telegram.calls)}")
+    print("\n".join(report(timings, elapsed)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    arguments = parser.parse_args()
+    app.loop.run_until_complete(main(arguments.users, arguments.rounds, arguments.concurrency))
@@ -0,0 +1,95 @@
+"""
+Measure bot process CPU time per query for ad-hoc statements and the predefined ones.
+
+Ad-hoc statements are rebuilt with literal values on every call, as the repository
+did before; predefined statements are the module-level ones in database/repository.py
+executed with bound parameters. Both run on the same connection against the database
+configured by the DB_* variables, and CPU time of this process (statement building,
+SQLAlchemy compilation or cache lookup, asyncpg encoding) is reported per query.
+
+Usage (from the bot directory):
+    python -m benchmarks.statement_cache --iterations 2000
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import not_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import async_engine, async_session, Task, User
+from database.repository import FIRST_TASKS_PAGE, TOGGLE_TASK, USER_BY_TG_ID
+
+
+async def measure(iterations: int, query: Callable[[int], Awaitable]) -> float:
+    """
+    Run the query and return CPU microseconds of this process per call.
+    """
+    await query(0)
+    started = time.process_time()
+    for number in range(iterations):
+        await query(number)
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def queries(session: AsyncSession, user: User, task_id: int):
+    async def user_ad_hoc(number: int):
+        await session.execute(select(User).where(User.tg_id == user.tg_id + number % 2))
+
+    async def user_predefined(number: int):
+        await session.execute(USER_BY_TG_ID, {"tg_id": user.tg_id + number % 2})
+
+    async def page_ad_hoc(number: int):
+        await session.execute(
+            select(Task).where(Task.user_id == user.id, Task.is_visible == True).order_by(Task.id).limit(6)
+        )
+
+    async def page_predefined(number: int):
+        await session.execute(FIRST_TASKS_PAGE, {"owner_id": user.id, "limit": 6})
+
+    async def toggle_ad_hoc(number: int):
+        await session.execute(
+            update(Task).where(
+                Task.user_id == user.id, Task.id == task_id, Task.is_visible == True
+            ).values(
+                is_complete=not_(func.coalesce(Task.is_complete, False))
+            ).returning(Task.id, Task.title, Task.is_complete)
+        )
+
+    async def toggle_predefined(number: int):
+        await session.execute(TOGGLE_TASK, {"owner_id": user.id, "task_id": task_id})
+
+    return [
+        ("get user", user_ad_hoc, user_predefined),
+        ("tasks page", page_ad_hoc, page_predefined),
+        ("toggle task", toggle_ad_hoc, toggle_predefined),
+    ]
+
+
+async def main(iterations: int) -> List[str]:
+    lines = [f"{'query':<14}{'ad-hoc us':>12}{'bound us':>12}{'saved':>9}"]
+    async with async_session() as session:
+        await session.begin()
+        try:
+            user = User(tg_id=-1, name="bench", login="bench-statement-cache")
+            session.add(user)
+            await session.flush()
+            task = Task(user_id=user.id, title="bench", description="bench", is_visible=True)
+            session.add(task)
+            await session.flush()
+            for name, ad_hoc, predefined in queries(session, user, task.id):
+                before = await measure(iterations, ad_hoc)
+                after = await measure(iterations, predefined)
+                lines.append(f"{name:<14}{before:>12.1f}{after:>12.1f}{(1 - after / before) * 100:>8.1f}%")
+        finally:
+            await session.rollback()
+    await async_engine.dispose()
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    arguments = parser.parse_args()
+    print("\n".join(asyncio.run(main(arguments.iterations))))
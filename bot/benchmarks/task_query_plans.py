@@ -0,0 +1,125 @@
+"""
+Compare query plans of the td_tasks hot queries before and after the task indexes.
+
+The benchmark builds a scratch schema, seeds it with generated users and tasks,
+measures the plan and execution time of every query without the indexes, applies
+the index migration and measures them again. Everything runs in one transaction
+that is rolled back, so the database is left untouched.
+
+Usage (from the bot directory):
+    python -m benchmarks.task_query_plans --users 2000 --tasks 200
+"""
+import argparse
+import asyncio
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from database.migrations import TASK_INDEXES
+from database.models import async_engine, Base
+
+SCHEMA = "bench_task_plans"
+
+QUERIES = {
+    "first page": "SELECT * FROM td_tasks WHERE user_id = :user_id AND is_visible ORDER BY id LIMIT 6",
+    "next page": "SELECT * FROM td_tasks WHERE user_id = :user_id AND is_visible AND id > :task_id ORDER BY id LIMIT 6",
+    "get task": "SELECT * FROM td_tasks WHERE user_id = :user_id AND id = :task_id",
+    "delete task": "DELETE FROM td_tasks WHERE user_id = :user_id AND id = :task_id",
+}
+
+
+def plan_nodes(plan: dict) -> str:
+    """
+    Describe the plan tree as a chain of node types with index names.
+    """
+    nodes = []
+    while plan:
+        node = plan["Node Type"]
+        if "Index Name" in plan:
+            node += f" ({plan['Index Name']})"
+        nodes.append(node)
+        plan = plan.get("Plans", [None])[0]
+    return " > ".join(nodes)
+
+
+async def explain(connection: AsyncConnection, params: dict) -> Dict[str, Tuple[str, float]]:
+    """
+    Run every query under EXPLAIN ANALYZE, rolling back the deletes.
+    """
+    plans = {}
+    for name, query in QUERIES.items():
+        savepoint = await connection.begin_nested()
+        result = await connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"), params)
+        [explained] = result.scalar()
+        await savepoint.rollback()
+        plans[name] = plan_nodes(explained["Plan"]), explained["Execution Time"]
+    return plans
+
+
+async def seed(connection: AsyncConnection, users: int, tasks: int) -> None:
+    """
+    Create the tables without task indexes and fill them with generated rows.
+    """
+    await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    await connection.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+    await connection.run_sync(Base.metadata.create_all)
+    for index in ("ix_td_tasks_user_id_id", "ix_td_tasks_visible_user_id_id", "ix_td_tasks_draft_user_id"):
+        await connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+    await connection.execute(
+        text("INSERT INTO td_users (tg_id, status) SELECT g, 'FINISH' FROM generate_series(1, :users) g"),
+        {"users": users},
+    )
+    await connection.execute(
+        text(
+            "INSERT INTO td_tasks (user_id, title, description, is_complete, is_visible) "
+            "SELECT u.id, 'task ' || t, 'description ' || t, t % 3 = 0, t % 10 <> 0 "
+            "FROM td_users u CROSS JOIN generate_series(1, :tasks) t"
+        ),
+        {"tasks": tasks},
+    )
+    await connection.execute(text("ANALYZE td_users"))
+    await connection.execute(text("ANALYZE td_tasks"))
+
+
+def report(before: Dict[str, Tuple[str, float]], after: Dict[str, Tuple[str, float]]) -> List[str]:
+    """
+    Format plans and timings side by side.
+    """
+    lines = []
+    for name in QUERIES:
+        (plan_before, time_before), (plan_after, time_after) = before[name], after[name]
+        lines.append(f"{name}:")
+        lines.append(f"  before {time_before:9.3f} ms  {plan_before}")
+        lines.append(f"  after  {time_after:9.3f} ms  {plan_after}")
+    return lines
+
+
+async def main(users: int, tasks: int) -> None:
+    async with async_engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            await seed(connection, users, tasks)
+            params = (await connection.execute(text(
+                "SELECT user_id, max(id) - 1 AS task_id FROM td_tasks "
+                "WHERE user_id = (SELECT max(id) / 2 FROM td_users) GROUP BY user_id"
+            ))).mappings().one()
+            before = await explain(connection, dict(params))
+            for statement in TASK_INDEXES:
+                await connection.execute(text(statement))
+            await connection.execute(text("ANALYZE td_tasks"))
+            after = await explain(connection, dict(params))
+        finally:
+            await transaction.rollback()
+    await async_engine.dispose()
+    print(f"td_tasks rows: {users * tasks}")
+    print("\n".join(report(before, after)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=200)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.users, arguments.tasks))
@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from database.models import User
+from main.variables import (
+    USER_CACHE_SIZE, USER_CACHE_TTL, LOGIN_CACHE_SIZE, LOGIN_CACHE_TTL, SELECTION_CACHE_SIZE, SELECTION_TTL
+)
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with a time to live for every entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached value or None if it is missing or expired.
+        """
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Put a value into the cache, evicting the least recently used entry when full.
+        """
+        if self._maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self._ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove a value from the cache.
+        """
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all values from the cache.
+        """
+        self._data.clear()
+
+
+class SnapshotCache(TTLCache):
+    """
+    TTL cache of model instances that keeps a tuple of their column values and builds
+    a new instance on every get, so handlers never share or change a cached object.
+    """
+
+    def __init__(self, model: type, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize, ttl)
+        self._model = model
+        self._keys = tuple(column.key for column in model.__table__.columns)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        values = super().get(key)
+        if values is None:
+            return None
+        return self._model(**dict(zip(self._keys, values)))
+
+    def set(self, key: Hashable, value: Any) -> None:
+        super().set(key, tuple(getattr(value, name) for name in self._keys))
+
+
+user_cache = SnapshotCache(User, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# Logins known to be taken. Logins are never released, so entries cannot go stale;
+# a login missing here is still claimed atomically in the database.
+taken_logins = TTLCache(maxsize=LOGIN_CACHE_SIZE, ttl=LOGIN_CACHE_TTL)
+
+# Task IDs selected in a /select keyboard, keyed by (chat ID, message ID). A keyboard
+# shows one page, so selections made on other pages are kept here. Updates of a user
+# are always handled by the same process, so a process-local cache is enough.
+task_selections = TTLCache(maxsize=SELECTION_CACHE_SIZE, ttl=SELECTION_TTL)
@@ -0,0 +1,167 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database.models import Base
+
+SCHEMA_VERSION_TABLE = "td_schema_version"
+MIGRATIONS_LOCK_ID = 7411
+DRAFT_DELETE_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    Schema change applied once and recorded in the schema version table.
+
+    `prepare` runs before the migration transaction, for work on existing rows that
+    must not hold the migration lock or table locks for long, such as batched deletes.
+    """
+    version: int
+    description: str
+    operations: Union[Callable[[Connection], None], List[str]]
+    prepare: Optional[Callable[[AsyncEngine], Awaitable[None]]] = None
+
+    def apply(self, connection: Connection) -> None:
+        """
+        Apply the migration on a synchronous connection.
+        """
+        if callable(self.operations):
+            self.operations(connection)
+            return
+        for statement in self.operations:
+            connection.execute(text(statement))
+
+
+TASK_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_td_tasks_user_id_id ON td_tasks (user_id, id)",
+    "CREATE INDEX IF NOT EXISTS ix_td_tasks_visible_user_id_id ON td_tasks (user_id, id) WHERE is_visible",
+    "CREATE INDEX IF NOT EXISTS ix_td_tasks_draft_user_id ON td_tasks (user_id) WHERE NOT is_visible",
+]
+
+DRAFT_CREATED_AT = [
+    "ALTER TABLE td_tasks ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_td_tasks_draft_created_at ON td_tasks (created_at) WHERE NOT is_visible",
+]
+
+TASK_SEARCH_INDEX = [
+    "CREATE INDEX IF NOT EXISTS ix_td_tasks_search ON td_tasks USING gin "
+    "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))",
+]
+
+TASK_REMINDERS = [
+    "ALTER TABLE td_tasks ADD COLUMN IF NOT EXISTS due_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE td_tasks ADD COLUMN IF NOT EXISTS remind_at TIMESTAMP WITH TIME ZONE",
+    "CREATE INDEX IF NOT EXISTS ix_td_tasks_remind_at ON td_tasks (remind_at, id) WHERE remind_at IS NOT NULL",
+]
+
+SHARED_LISTS = [
+    "CREATE TABLE IF NOT EXISTS td_lists ("
+    "id SERIAL PRIMARY KEY, "
+    "owner_id INTEGER NOT NULL REFERENCES td_users (id), "
+    "name VARCHAR(100) NOT NULL, "
+    "invite_code VARCHAR(16) NOT NULL UNIQUE, "
+    "created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now())",
+    "CREATE TABLE IF NOT EXISTS td_list_members ("
+    "list_id INTEGER NOT NULL REFERENCES td_lists (id) ON DELETE CASCADE, "
+    "user_id INTEGER NOT NULL REFERENCES td_users (id), "
+    "PRIMARY KEY (list_id, user_id))",
+    "CREATE INDEX IF NOT EXISTS ix_td_list_members_user_id ON td_list_members (user_id, list_id)",
+    "ALTER TABLE td_tasks ADD COLUMN IF NOT EXISTS list_id INTEGER REFERENCES td_lists (id)",
+    "CREATE INDEX IF NOT EXISTS ix_td_tasks_visible_list_id_id ON td_tasks (list_id, id) "
+    "WHERE is_visible AND list_id IS NOT NULL",
+]
+
+DELETE_DRAFTS_BATCH = text(
+    "DELETE FROM td_tasks WHERE id IN "
+    "(SELECT id FROM td_tasks WHERE NOT is_visible LIMIT :limit FOR UPDATE SKIP LOCKED)"
+)
+
+DROP_DRAFT_INDEXES = [
+    "DROP INDEX IF EXISTS ix_td_tasks_draft_user_id",
+    "DROP INDEX IF EXISTS ix_td_tasks_draft_created_at",
+]
+
+
+async def delete_drafts(engine: AsyncEngine) -> None:
+    """
+    Delete draft tasks left by older versions in bounded batches, one transaction each.
+    Rows locked by running transactions are skipped, so the deletion never waits on users.
+    """
+    total = 0
+    while True:
+        async with engine.begin() as connection:
+            deleted = (await connection.execute(DELETE_DRAFTS_BATCH, {"limit": DRAFT_DELETE_BATCH_SIZE})).rowcount
+        total += deleted
+        if deleted < DRAFT_DELETE_BATCH_SIZE:
+            break
+        await asyncio.sleep(0.1)
+    if total:
+        print(f"Deleted draft tasks: {total}")
+
+
+MIGRATIONS = [
+    Migration(1, "Create tables", Base.metadata.create_all),
+    Migration(2, "Index td_tasks by user for lookups, pages and drafts", TASK_INDEXES),
+    Migration(3, "Add td_tasks.created_at for sweeping abandoned drafts", DRAFT_CREATED_AT),
+    Migration(4, "Index td_tasks for full-text search", TASK_SEARCH_INDEX),
+    Migration(5, "Add td_tasks due dates and reminders", TASK_REMINDERS),
+    Migration(6, "Add shared task lists and their members", SHARED_LISTS),
+    Migration(7, "Drop abandoned draft tasks and their indexes", DROP_DRAFT_INDEXES, prepare=delete_drafts),
+]
+
+
+LATEST_VERSION = max(migration.version for migration in MIGRATIONS)
+
+
+def _current_version(connection: Connection) -> int:
+    exists = connection.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": SCHEMA_VERSION_TABLE}).scalar()
+    if not exists:
+        return 0
+    return connection.execute(text(f"SELECT coalesce(max(version), 0) FROM {SCHEMA_VERSION_TABLE}")).scalar()
+
+
+def _migrate(connection: Connection) -> List[int]:
+    connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now())"
+    ))
+    current = _current_version(connection)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        migration.apply(connection)
+        connection.execute(
+            text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (:version, :description)"),
+            {"version": migration.version, "description": migration.description},
+        )
+        applied.append(migration.version)
+    return applied
+
+
+async def migrate(engine: AsyncEngine) -> List[int]:
+    """
+    Apply pending migrations in one transaction and return their versions.
+    When the schema is already at the latest version no lock is taken and no DDL runs.
+    An advisory lock keeps concurrently starting bots from migrating twice.
+    Preparations of pending migrations run first, outside that transaction; a new
+    database has no rows to prepare.
+    """
+    async with engine.connect() as connection:
+        current = await connection.run_sync(_current_version)
+    if current >= LATEST_VERSION:
+        return []
+    if current > 0:
+        for migration in MIGRATIONS:
+            if migration.version > current and migration.prepare is not None:
+                await migration.prepare(engine)
+    async with engine.begin() as connection:
+        return await connection.run_sync(_migrate)
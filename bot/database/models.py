@@ -1,14 +1,41 @@
 import enum
-from sqlalchemy import Integer, Column, ForeignKey, String, Enum, Boolean, text, MetaData
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import Integer, Column, ForeignKey, String, Enum, Boolean, DateTime, Index, func, literal_column, text, MetaData
 
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from main.variables import DB_URL
+from database.pool import InstrumentedQueuePool, instrument_engine
+from main.variables import (
+    DB_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_COMMAND_TIMEOUT,
+    SLOW_QUERY_THRESHOLD,
+)
 
 Base = declarative_base()
 
-async_engine = create_async_engine(url=DB_URL)
+async_engine = create_async_engine(
+    url=DB_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "command_timeout": DB_COMMAND_TIMEOUT,
+    },
+)
+instrument_engine(async_engine.sync_engine, SLOW_QUERY_THRESHOLD)
 async_session = async_sessionmaker(async_engine)
 
 
@@ -24,6 +51,9 @@ class StatesUserEnum(enum.IntEnum):
     UPDATE_TASK_START = 20
     UPDATE_TASK_TITLE = 21
     UPDATE_TASK_DESCRIPTION = 22
+    REMIND_TASK_START = 30
+    REMIND_TASK_DUE = 31
+    REMIND_TASK_REMIND = 32
 
 
 class User(Base):
@@ -36,7 +66,7 @@ class User(Base):
     tg_id: int = Column(Integer, unique=True, nullable=False)
     status: StatesUserEnum = Column(Enum(StatesUserEnum), default=StatesUserEnum.START)
     task_id: int = Column(Integer, nullable=True)
-    tasks = relationship("Task", back_populates="user")
+    tasks = relationship("Task", back_populates="user", lazy="raise")
 
 
 class Task(Base):
@@ -49,4 +79,66 @@ class Task(Base):
     description: str = Column(String(300), nullable=True)
     is_complete: bool = Column(Boolean, default=False)
     is_visible: bool = Column(Boolean, default=False)
-    user = relationship("User", back_populates="tasks")
+    created_at: datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    due_at: datetime = Column(DateTime(timezone=True), nullable=True)
+    remind_at: datetime = Column(DateTime(timezone=True), nullable=True)
+    list_id: int = Column(Integer, ForeignKey('td_lists.id'), nullable=True)
+    user = relationship("User", back_populates="tasks", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_td_tasks_user_id_id", "user_id", "id"),
+        Index("ix_td_tasks_visible_user_id_id", "user_id", "id", postgresql_where=text("is_visible")),
+        Index("ix_td_tasks_remind_at", "remind_at", "id", postgresql_where=text("remind_at IS NOT NULL")),
+        Index(
+            "ix_td_tasks_visible_list_id_id", "list_id", "id",
+            postgresql_where=text("is_visible AND list_id IS NOT NULL"),
+        ),
+    )
+
+
+class TaskList(Base):
+    """Task list shared by its members."""
+    __tablename__ = 'td_lists'
+
+    id: int = Column(Integer, primary_key=True)
+    owner_id: int = Column(Integer, ForeignKey('td_users.id'), nullable=False)
+    name: str = Column(String(100), nullable=False)
+    invite_code: str = Column(String(16), unique=True, nullable=False)
+    created_at: datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class ListMember(Base):
+    """Membership of a user in a task list."""
+    __tablename__ = 'td_list_members'
+
+    list_id: int = Column(Integer, ForeignKey('td_lists.id', ondelete="CASCADE"), primary_key=True)
+    user_id: int = Column(Integer, ForeignKey('td_users.id'), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_td_list_members_user_id", "user_id", "list_id"),
+    )
+
+
+class TaskCard(NamedTuple):
+    """Task columns shown on a task card, loaded without ORM entities."""
+    id: int
+    title: str
+    description: Optional[str]
+    is_complete: Optional[bool]
+    due_at: Optional[datetime]
+    is_own: bool
+
+
+def task_search_vector():
+    """
+    Full-text search document of a task, matching the expression of the ix_td_tasks_search index.
+    """
+    return func.to_tsvector(
+        literal_column("'simple'"),
+        func.coalesce(Task.title, literal_column("''"))
+        .concat(literal_column("' '"))
+        .concat(func.coalesce(Task.description, literal_column("''"))),
+    )
+
+
+Index("ix_td_tasks_search", task_search_vector(), postgresql_using="gin")
@@ -0,0 +1,108 @@
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from main.metrics import connections_in_use, query_seconds, session_seconds, slow_queries
+
+
+class PoolMetrics:
+    """
+    Connection pool counters shared by every pool the engine recreates.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts: int = 0
+        self.wait_seconds_total: float = 0.0
+        self.wait_seconds_max: float = 0.0
+        self.overflow_events: int = 0
+        self.timeouts: int = 0
+
+    def record_checkout(self, wait_seconds: float, overflow: bool) -> None:
+        """
+        Record a successful checkout and the time spent waiting for it.
+        """
+        self.checkouts += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        if overflow:
+            self.overflow_events += 1
+
+    def snapshot(self, pool: AsyncAdaptedQueuePool) -> dict:
+        """
+        Get current pool state together with the accumulated counters.
+        """
+        return {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": self.checkouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records checkout wait time, overflow connections and timeouts.
+    """
+
+    metrics = pool_metrics
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record_checkout(
+            time.perf_counter() - started,
+            overflow=self._overflow > overflow_before and self._overflow > 0,
+        )
+        return connection
+
+
+def instrument_engine(engine: Engine, slow_query_threshold: float) -> None:
+    """
+    Record statement execution and connection hold times of an engine.
+    Statements slower than the threshold in seconds are logged; 0 disables the log.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - connection.info["query_started"].pop()
+        query_seconds.observe(elapsed, statement.split(None, 1)[0].upper() if statement else "")
+        if slow_query_threshold and elapsed >= slow_query_threshold:
+            slow_queries.inc()
+            print(f"Slow query ({elapsed * 1000:.1f} ms): {' '.join(statement.split())}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        connections_in_use.inc()
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            session_seconds.observe(time.perf_counter() - checked_out_at)
+            connections_in_use.dec()
@@ -1,15 +1,261 @@
-from sqlalchemy import select, delete
+import secrets
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from sqlalchemy import (
+    Integer, and_, any_, bindparam, cast, exists, func, literal_column, not_, or_, select, delete, insert, tuple_, union_all, update,
+)
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import aliased
+
+from database.cache import user_cache, taken_logins
+from database.models import async_session, User, Task, TaskCard, TaskList, ListMember, StatesUserEnum, task_search_vector
+from main.metrics import instrument_static_methods
+from main.variables import TASK_CARD_DESCRIPTION_LENGTH
+
+# Hot statements are built once with bound parameters. Reusing the same statement objects
+# skips construction and cache key generation, hits SQLAlchemy's compiled cache and keeps
+# the SQL text stable, so asyncpg reuses its server-side prepared statements. Sessions are
+# short-lived, so DML statements skip synchronizing the identity map.
+
+USER_BY_TG_ID = select(User).where(User.tg_id == bindparam("tg_id"))
+
+_LOGIN_OWNER = aliased(User)
+
+# Registration sets the login only if no other user has it. Two users claiming the same
+# login at once both pass NOT EXISTS, and the unique constraint rejects the later one.
+CLAIM_LOGIN = update(User).where(
+    User.id == bindparam("user_id"),
+    ~exists().where(_LOGIN_OWNER.login == bindparam("new_login"), _LOGIN_OWNER.id != User.id),
+).values(
+    name=bindparam("new_name"),
+    login=bindparam("new_login"),
+    status=StatesUserEnum.FINISH,
+    task_id=None,
+).returning(User.id)
+
+TASK_CARD_COLUMNS = (
+    Task.id,
+    Task.title,
+    func.left(Task.description, TASK_CARD_DESCRIPTION_LENGTH).label("description"),
+    Task.is_complete,
+    Task.due_at,
+    (Task.user_id == bindparam("owner_id")).label("is_own"),
+)
+
+# Tasks a user can see and change: their own and those of the lists they are a member of.
+# The user's list IDs are aggregated once per statement, so shared tasks are found
+# through the list index.
+_MEMBER_LIST_IDS = cast(select(
+    func.array_agg(ListMember.list_id)
+).where(ListMember.user_id == bindparam("owner_id")).scalar_subquery(), ARRAY(Integer))
+
+_ACCESSIBLE = or_(Task.user_id == bindparam("owner_id"), Task.list_id == any_(_MEMBER_LIST_IDS))
+
+_SHARED_WITH_USER = and_(Task.list_id == any_(_MEMBER_LIST_IDS), Task.user_id != bindparam("owner_id"))
+
+
+def _visible_tasks(*criteria, descending: bool = False, shared: bool = True):
+    """
+    Select visible task cards of the user and, if shared, of the user's lists in ID order.
+    Own and shared tasks are read by separate index scans and merged, so the OR
+    of the two never turns a page into a scan of the whole table in ID order.
+    """
+    order = Task.id.desc() if descending else Task.id
+    owners = [Task.user_id == bindparam("owner_id"), *([_SHARED_WITH_USER] if shared else [])]
+    branches = []
+    for owner in owners:
+        branch = select(*TASK_CARD_COLUMNS).where(owner, Task.is_visible == True, *criteria).order_by(order)
+        branches.append(branch.limit(bindparam("limit")))
+    if not shared:
+        return branches[0]
+    tasks = union_all(*branches).subquery()
+    statement = select(*tasks.c).order_by(tasks.c.id.desc() if descending else tasks.c.id)
+    return statement.limit(bindparam("limit"))
+
+
+EXPORT_TASKS = select(
+    Task.title, Task.description, Task.is_complete, Task.due_at, Task.remind_at
+).where(Task.user_id == bindparam("owner_id"), Task.is_visible == True).order_by(Task.id)
+
+IMPORT_COLUMNS = ["user_id", "is_visible", "title", "description", "is_complete", "due_at", "remind_at"]
+
+FIRST_TASKS_PAGE = _visible_tasks()
+
+TASKS_PAGE_AFTER = _visible_tasks(Task.id > bindparam("after_id"))
+
+TASKS_PAGE_BEFORE = _visible_tasks(Task.id < bindparam("before_id"), descending=True)
+
+OWN_FIRST_TASKS_PAGE = _visible_tasks(shared=False)
+
+OWN_TASKS_PAGE_AFTER = _visible_tasks(Task.id > bindparam("after_id"), shared=False)
+
+OWN_TASKS_PAGE_BEFORE = _visible_tasks(Task.id < bindparam("before_id"), descending=True, shared=False)
+
+_SEARCH_VECTOR = task_search_vector()
+_SEARCH_QUERY = func.websearch_to_tsquery(literal_column("'simple'"), bindparam("query"))
+
+SEARCH_TASKS = select(*TASK_CARD_COLUMNS).where(
+    _ACCESSIBLE, Task.is_visible == True, _SEARCH_VECTOR.bool_op("@@")(_SEARCH_QUERY)
+).order_by(
+    func.ts_rank(_SEARCH_VECTOR, _SEARCH_QUERY).desc(), Task.id.desc()
+).offset(bindparam("offset")).limit(bindparam("limit"))
+
+TOGGLE_TASK = update(Task).where(
+    _ACCESSIBLE, Task.id == bindparam("task_id"), Task.is_visible == True
+).values(
+    is_complete=not_(func.coalesce(Task.is_complete, False))
+).returning(Task.id, Task.title, Task.is_complete, Task.list_id).execution_options(synchronize_session=False)
+
+DELETE_TASK = delete(Task).where(
+    _ACCESSIBLE, Task.id == bindparam("task_id")
+).returning(Task.title, Task.list_id).execution_options(synchronize_session=False)
+
+UPDATE_TASK_RETURNING = (Task.id, Task.title, Task.list_id)
+
+TASK_EXISTS = select(Task.id).where(_ACCESSIBLE, Task.id == bindparam("task_id"), Task.is_visible == True)
+
+OWN_TASK_EXISTS = select(Task.id).where(
+    Task.user_id == bindparam("owner_id"), Task.id == bindparam("task_id"), Task.is_visible == True
+)
+
+LIST_MEMBER_CHATS = select(User.tg_id).join(ListMember, ListMember.user_id == User.id).where(
+    ListMember.list_id == bindparam("list_id"), User.id != bindparam("exclude_user_id")
+)
+
+_LIST_MEMBERS = aliased(ListMember)
+
+USER_LISTS = select(
+    TaskList.id, TaskList.name, TaskList.invite_code,
+    select(func.count()).where(_LIST_MEMBERS.list_id == TaskList.id).scalar_subquery().label("members"),
+).join(ListMember, ListMember.list_id == TaskList.id).where(
+    ListMember.user_id == bindparam("owner_id")
+).order_by(TaskList.id)
 
-from database.models import async_session, User, Task
+CREATE_LIST = insert(TaskList).values(
+    owner_id=bindparam("owner_id"), name=bindparam("new_name"), invite_code=bindparam("invite_code")
+).returning(TaskList.id, TaskList.name, TaskList.invite_code)
 
+LIST_BY_INVITE_CODE = select(TaskList.id, TaskList.name).where(TaskList.invite_code == bindparam("invite_code"))
 
+JOIN_LIST = pg_insert(ListMember).values(
+    list_id=bindparam("list_id"), user_id=bindparam("owner_id")
+).on_conflict_do_nothing()
+
+LEAVE_LIST = delete(ListMember).where(
+    ListMember.user_id == bindparam("owner_id"),
+    ListMember.list_id.in_(select(TaskList.id).where(TaskList.invite_code == bindparam("invite_code"))),
+).returning(ListMember.list_id).execution_options(synchronize_session=False)
+
+_TASK_IDS = Task.id == any_(bindparam("task_ids", type_=ARRAY(Integer)))
+
+_OWN_TASKS_BY_IDS = update(Task).where(Task.user_id == bindparam("owner_id"), _TASK_IDS)
+
+SHARE_TASKS = _OWN_TASKS_BY_IDS.where(
+    exists().where(ListMember.list_id == bindparam("new_list_id"), ListMember.user_id == bindparam("owner_id"))
+).values(list_id=bindparam("new_list_id")).returning(Task.id).execution_options(synchronize_session=False)
+
+UNSHARE_TASKS = _OWN_TASKS_BY_IDS.values(list_id=None).returning(Task.id).execution_options(synchronize_session=False)
+
+UPCOMING_REMINDERS = select(Task.id, Task.remind_at, User.tg_id).join(User, User.id == Task.user_id).where(
+    Task.remind_at < bindparam("until"),
+    tuple_(Task.remind_at, Task.id) > tuple_(bindparam("after_at", type_=Task.remind_at.type), bindparam("after_id")),
+).order_by(Task.remind_at, Task.id).limit(bindparam("limit"))
+
+CLAIM_REMINDERS = update(Task).where(
+    Task.user_id == User.id, _TASK_IDS, Task.remind_at <= bindparam("now")
+).values(remind_at=None).returning(
+    Task.id, User.tg_id, Task.title, Task.due_at, Task.is_complete
+).execution_options(synchronize_session=False)
+
+
+@lru_cache(maxsize=None)
+def _set_tasks_complete_statement(by_ids: bool):
+    return update(Task).where(
+        Task.user_id == bindparam("owner_id"),
+        Task.is_visible == True,
+        Task.is_complete.is_distinct_from(bindparam("new_is_complete")),
+        *([_TASK_IDS] if by_ids else []),
+    ).values(is_complete=bindparam("new_is_complete")).returning(Task.id).execution_options(synchronize_session=False)
+
+
+@lru_cache(maxsize=None)
+def _delete_tasks_statement(by_ids: bool, by_status: bool):
+    return delete(Task).where(
+        Task.user_id == bindparam("owner_id"),
+        Task.is_visible == True,
+        *([_TASK_IDS] if by_ids else []),
+        *([Task.is_complete == bindparam("is_complete")] if by_status else []),
+    ).execution_options(synchronize_session=False)
+
+
+class UnitOfWork:
+    """
+    Unit of work persisting one FSM transition in a single transaction.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._session: Optional[AsyncSession] = None
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self._session = self._session_factory()
+        await self._session.begin()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                await self._session.commit()
+            else:
+                await self._session.rollback()
+        finally:
+            await self._session.close()
+
+    async def insert_task(self, task: Task) -> Task:
+        """
+        Insert a task and set its ID with INSERT ... RETURNING.
+        """
+        values = {
+            column.key: getattr(task, column.key)
+            for column in Task.__table__.columns
+            if getattr(task, column.key) is not None
+        }
+        result = await self._session.execute(insert(Task).values(**values).returning(Task.id))
+        task.id = result.scalar_one()
+        return task
+
+    async def update_task(self, user: User, task_id: int, **values) -> Row:
+        """
+        Update fields of a task the user can access with UPDATE ... RETURNING.
+        Returns the task ID, title and list ID. Raises NoResultFound if the task does not exist.
+        """
+        statement = update(Task).where(
+            _ACCESSIBLE, Task.id == bindparam("task_id")
+        ).values(**values).returning(*UPDATE_TASK_RETURNING).execution_options(synchronize_session=False)
+        result = await self._session.execute(statement, {"owner_id": user.id, "task_id": task_id})
+        return result.one()
+
+
+@instrument_static_methods
 class Repository:
     """
     Repository class implementing data access methods.
     """
     async_session = async_session
 
+    @staticmethod
+    def unit_of_work() -> UnitOfWork:
+        """
+        Create a unit of work that commits all its statements in one transaction.
+        """
+        return UnitOfWork(Repository.async_session)
+
     @staticmethod
     async def create_user(tg_id: str) -> User:
         """
@@ -20,97 +266,271 @@ class Repository:
             session.add(new_user)
             await session.commit()
             await session.refresh(new_user)
+            user_cache.set(new_user.tg_id, new_user)
             return new_user
 
     @staticmethod
     async def get_user(tg_id: str = None) -> User:
         """
-        Get a user based on the Telegram ID.
+        Get a user based on the Telegram ID, served from the user cache when possible.
+        """
+        user = user_cache.get(tg_id)
+        if user is not None:
+            return user
+        async with Repository.async_session() as session:
+            result = await session.execute(USER_BY_TG_ID, {"tg_id": tg_id})
+            user = result.scalar_one_or_none()
+        if user is not None:
+            user_cache.set(tg_id, user)
+        return user
+
+    @staticmethod
+    async def claim_login(user: User, name: str, login: str) -> bool:
+        """
+        Finish registration of a user with the given name and login in one conditional UPDATE.
+        Returns False without a query if the login is known to be taken, and False if
+        another user has it. Taken logins are remembered in the login cache.
         """
+        if taken_logins.get(login):
+            return False
         async with Repository.async_session() as session:
-            statement = select(User).where(User.tg_id == tg_id)
-            result = await session.execute(statement)
-            return result.scalar_one_or_none()
+            try:
+                result = await session.execute(
+                    CLAIM_LOGIN, {"user_id": user.id, "new_name": name, "new_login": login}
+                )
+                claimed = result.scalar_one_or_none() is not None
+                await session.commit()
+            except IntegrityError:
+                claimed = False
+        taken_logins.set(login, True)
+        if claimed:
+            user.name, user.login = name, login
+            user.status, user.task_id = StatesUserEnum.FINISH, None
+            user_cache.set(user.tg_id, user)
+        return claimed
 
     @staticmethod
-    async def user_exists_by_login(login: str) -> bool:
+    async def get_tasks_page(
+        user, after_id: Optional[int] = None, before_id: Optional[int] = None, limit: int = 5, shared: bool = True
+    ) -> Tuple[List[TaskCard], bool, bool]:
         """
-        Check if a user with the given login exists.
+        Get a page of visible task cards using keyset pagination by task ID, without
+        tasks shared with the user unless shared is set.
+        Returns the tasks in ascending ID order and flags for previous and next pages.
         """
+        params = {"owner_id": user.id, "limit": limit + 1}
+        if before_id is not None:
+            statement, params["before_id"] = TASKS_PAGE_BEFORE if shared else OWN_TASKS_PAGE_BEFORE, before_id
+        elif after_id is not None:
+            statement, params["after_id"] = TASKS_PAGE_AFTER if shared else OWN_TASKS_PAGE_AFTER, after_id
+        else:
+            statement = FIRST_TASKS_PAGE if shared else OWN_FIRST_TASKS_PAGE
         async with Repository.async_session() as session:
-            stmt = select(User).where(User.login == login)
-            result = await session.execute(stmt)
-            user = result.scalar()
-            return user is not None
+            result = await session.execute(statement, params)
+            tasks = [TaskCard._make(row) for row in result]
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        if before_id is not None:
+            tasks.reverse()
+            return tasks, has_more, True
+        return tasks, after_id is not None, has_more
 
     @staticmethod
-    async def get_task(user, task_id=None):
+    async def search_tasks(user, query: str, limit: int = 5, offset: int = 0) -> Tuple[List[TaskCard], bool]:
         """
-        Get a task for the specified user and task ID.
+        Full-text search of the user's visible tasks by title and description.
+        Returns a page of tasks ranked by relevance and whether more results follow.
         """
-        result = await Repository.get_tasks(user, params={"id": task_id if task_id else user.task_id})
-        return result[0][0] if result else []
+        async with Repository.async_session() as session:
+            result = await session.execute(SEARCH_TASKS, {
+                "owner_id": user.id, "query": query, "offset": offset, "limit": limit + 1
+            })
+            tasks = [TaskCard._make(row) for row in result]
+        return tasks[:limit], len(tasks) > limit
 
     @staticmethod
-    async def get_tasks(user, params: dict) -> User:
+    async def iter_export_rows(user, batch_size: int = 500) -> AsyncIterator[Row]:
         """
-        Get tasks for the specified user based on parameters.
+        Stream title, description, status, due date and reminder time of all visible tasks
+        of the user in ID order through a server-side cursor, one batch in memory at a time.
         """
         async with Repository.async_session() as session:
-            statement = select(Task).where(
-                Task.user_id == user.id,
-                *[getattr(Task, param) == value for param, value in params.items()]
+            result = await session.stream(
+                EXPORT_TASKS, {"owner_id": user.id}, execution_options={"yield_per": batch_size}
             )
-            result = await session.execute(statement)
-            return result.fetchall()
+            async for row in result:
+                yield row
 
     @staticmethod
-    async def find_models(db_model, params):
+    async def import_tasks(user, records: Iterable[Tuple], batch_size: int = 1000) -> int:
         """
-        Find models in the database based on the specified parameters.
+        Insert visible tasks from (title, description, is_complete, due_at, remind_at) records
+        with one COPY per batch, all in one transaction. Records are consumed lazily, so
+        only one batch is held in memory. Returns the number of inserted tasks.
         """
+        records = iter(records)
+        count = 0
         async with Repository.async_session() as session:
-            db_models = await session.query(db_model).filter_by(**params).all()
-            return db_models
+            connection = await session.connection()
+            driver_connection = (await connection.get_raw_connection()).driver_connection
+            async with driver_connection.transaction():
+                while batch := [(user.id, True, *record) for record in islice(records, batch_size)]:
+                    await driver_connection.copy_records_to_table(
+                        Task.__tablename__, records=batch, columns=IMPORT_COLUMNS, schema_name=Task.__table__.schema
+                    )
+                    count += len(batch)
+        return count
 
     @staticmethod
-    async def delete_not_visible_task(user):
+    async def task_exists(user, task_id: int, own: bool = False) -> bool:
         """
-        Delete tasks that are not visible for the specified user.
+        Check that a visible task exists and the user can access it, or owns it if own.
         """
+        statement = OWN_TASK_EXISTS if own else TASK_EXISTS
         async with Repository.async_session() as session:
-            stmt = delete(Task).where(Task.is_visible == False, Task.user_id == user.id)
-            await session.execute(stmt)
+            result = await session.execute(statement, {"owner_id": user.id, "task_id": task_id})
+            return result.first() is not None
+
+    @staticmethod
+    async def toggle_task(user, task_id: int) -> Optional[Row]:
+        """
+        Flip the completion status of a task atomically with UPDATE ... RETURNING.
+        Returns the task ID, title and new status, or None if the task does not exist.
+        """
+        async with Repository.async_session() as session:
+            result = await session.execute(TOGGLE_TASK, {"owner_id": user.id, "task_id": task_id})
             await session.commit()
+            return result.one_or_none()
 
     @staticmethod
-    async def save(*models):
+    async def set_tasks_complete(user, is_complete: bool, task_ids: Optional[List[int]] = None) -> List[int]:
         """
-        Save models in the database.
+        Set the completion status of the user's visible tasks in one statement.
+        Only the given tasks are changed when task IDs are passed. Returns IDs of changed tasks.
         """
         async with Repository.async_session() as session:
-            for model in models:
-                session.add(model)
-            try:
-                await session.flush()
-                await session.commit()
-                for model in models:
-                    await session.refresh(model)
-                return True, models
-            except IntegrityError:
-                return False, models
-            except Exception:
-                return False, models
+            statement = _set_tasks_complete_statement(task_ids is not None)
+            params = {"owner_id": user.id, "new_is_complete": is_complete}
+            if task_ids is not None:
+                params["task_ids"] = task_ids
+            result = await session.execute(statement, params)
+            await session.commit()
+            return list(result.scalars())
+
+    @staticmethod
+    async def delete_tasks(user, task_ids: Optional[List[int]] = None, is_complete: Optional[bool] = None) -> int:
+        """
+        Delete the user's visible tasks in one statement, optionally only given IDs or completion status.
+        Returns the number of deleted tasks.
+        """
+        async with Repository.async_session() as session:
+            statement = _delete_tasks_statement(task_ids is not None, is_complete is not None)
+            params = {"owner_id": user.id, "task_ids": task_ids, "is_complete": is_complete}
+            result = await session.execute(statement, params)
+            await session.commit()
+            return result.rowcount
+
+    @staticmethod
+    async def get_upcoming_reminders(
+        until: datetime, after_at: datetime, after_id: int, limit: int
+    ) -> List[Row]:
+        """
+        Get IDs, times and owner Telegram IDs of reminders due before until, after the (after_at, after_id) keyset cursor.
+        """
+        async with Repository.async_session() as session:
+            result = await session.execute(UPCOMING_REMINDERS, {
+                "until": until, "after_at": after_at, "after_id": after_id, "limit": limit
+            })
+            return result.all()
+
+    @staticmethod
+    async def claim_reminders(task_ids: List[int], now: datetime) -> List[Row]:
+        """
+        Clear reminders of the given tasks that are due and return them with the owner's Telegram ID.
+        Reminders moved to a later time or already claimed by another process are skipped, and
+        reminders of completed tasks are cleared without being returned.
+        """
+        async with Repository.async_session() as session:
+            result = await session.execute(CLAIM_REMINDERS, {"task_ids": task_ids, "now": now})
+            await session.commit()
+            return [reminder for reminder in result.all() if not reminder.is_complete]
+
+    @staticmethod
+    async def delete_task(user, task_id) -> Optional[Row]:
+        """
+        Delete a task the user can access. Returns its title and list ID, or None if it does not exist.
+        """
+        async with Repository.async_session() as session:
+            result = await session.execute(DELETE_TASK, {"owner_id": user.id, "task_id": task_id})
+            await session.commit()
+            return result.one_or_none()
+
+    @staticmethod
+    async def create_list(user, name: str) -> Row:
+        """
+        Create a task list owned by the user, with the user as its first member.
+        Returns the list ID, name and invite code.
+        """
+        async with Repository.async_session() as session:
+            result = await session.execute(CREATE_LIST, {
+                "owner_id": user.id, "new_name": name, "invite_code": secrets.token_urlsafe(9)
+            })
+            task_list = result.one()
+            await session.execute(JOIN_LIST, {"list_id": task_list.id, "owner_id": user.id})
+            await session.commit()
+            return task_list
+
+    @staticmethod
+    async def join_list(user, invite_code: str) -> Optional[Row]:
+        """
+        Add the user to the list with the invite code. Returns the list ID and name, or None for an unknown code.
+        """
+        async with Repository.async_session() as session:
+            task_list = (await session.execute(LIST_BY_INVITE_CODE, {"invite_code": invite_code})).one_or_none()
+            if task_list is None:
+                return None
+            await session.execute(JOIN_LIST, {"list_id": task_list.id, "owner_id": user.id})
+            await session.commit()
+            return task_list
 
     @staticmethod
-    async def delete_task(user, task_id) -> User:
+    async def leave_list(user, invite_code: str) -> bool:
         """
-        Delete a task for the specified user and task ID.
+        Remove the user from the list with the invite code. Returns False if the user was not a member.
         """
         async with Repository.async_session() as session:
-            statement = delete(Task).where(
-                Task.user_id == user.id, Task.id == task_id
+            result = await session.execute(LEAVE_LIST, {"owner_id": user.id, "invite_code": invite_code})
+            await session.commit()
+            return result.first() is not None
+
+    @staticmethod
+    async def get_lists(user) -> List[Row]:
+        """
+        Get ID, name, invite code and member count of every list the user is a member of.
+        """
+        async with Repository.async_session() as session:
+            result = await session.execute(USER_LISTS, {"owner_id": user.id})
+            return list(result)
+
+    @staticmethod
+    async def share_tasks(user, task_ids: List[int], list_id: Optional[int]) -> List[int]:
+        """
+        Move the user's own tasks into a list the user is a member of, or out of any list
+        when list_id is None. Returns IDs of moved tasks.
+        """
+        statement = UNSHARE_TASKS if list_id is None else SHARE_TASKS
+        async with Repository.async_session() as session:
+            result = await session.execute(
+                statement, {"owner_id": user.id, "task_ids": task_ids, "new_list_id": list_id}
             )
-            result = await session.execute(statement)
             await session.commit()
-            return result
+            return list(result.scalars())
+
+    @staticmethod
+    async def get_list_member_chats(list_id: int, exclude_user_id: int) -> List[int]:
+        """
+        Get Telegram chat IDs of all members of a list except one user, in one query.
+        """
+        async with Repository.async_session() as session:
+            result = await session.execute(LIST_MEMBER_CHATS, {"list_id": list_id, "exclude_user_id": exclude_user_id})
+            return list(result.scalars())
@@ -0,0 +1,194 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+from urllib.parse import urlparse
+
+from database.cache import TTLCache
+from database.models import StatesUserEnum
+from main.variables import STATE_STORE_URL, STATE_TTL
+
+
+@dataclass
+class FSMState:
+    """
+    Transient FSM state of a user: current status, edited task and collected input.
+    """
+    status: StatesUserEnum
+    task_id: Optional[int] = None
+    data: Dict[str, str] = field(default_factory=dict)
+
+    def dumps(self) -> str:
+        """Serialize the state to JSON."""
+        return json.dumps({"status": int(self.status), "task_id": self.task_id, "data": self.data})
+
+    @classmethod
+    def loads(cls, raw: Union[str, bytes]) -> "FSMState":
+        """Deserialize the state from JSON."""
+        value = json.loads(raw)
+        return cls(StatesUserEnum(value["status"]), value["task_id"], value["data"])
+
+
+class StateStore:
+    """
+    Base class for FSM state storages keyed by user Telegram ID.
+    """
+
+    async def get(self, tg_id: int) -> Optional[FSMState]:
+        """
+        Get the state of a user or None if the user is not inside a flow.
+        """
+        raise NotImplementedError("Subclasses must implement get.")
+
+    async def set(self, tg_id: int, state: FSMState) -> None:
+        """
+        Save the state of a user.
+        """
+        raise NotImplementedError("Subclasses must implement set.")
+
+    async def delete(self, tg_id: int) -> None:
+        """
+        Forget the state of a user.
+        """
+        raise NotImplementedError("Subclasses must implement delete.")
+
+    async def close(self) -> None:
+        """
+        Release resources held by the storage.
+        """
+
+
+class MemoryStateStore(StateStore):
+    """
+    Process-local state storage. States are lost on restart.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 100000) -> None:
+        self._states = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, tg_id: int) -> Optional[FSMState]:
+        raw = self._states.get(tg_id)
+        return FSMState.loads(raw) if raw is not None else None
+
+    async def set(self, tg_id: int, state: FSMState) -> None:
+        self._states.set(tg_id, state.dumps())
+
+    async def delete(self, tg_id: int) -> None:
+        self._states.invalidate(tg_id)
+
+
+class RedisError(Exception):
+    """
+    Error reply of a Redis-protocol server.
+    """
+
+
+class RedisStateStore(StateStore):
+    """
+    State storage on any server speaking the Redis protocol (RESP).
+
+    Uses a single connection opened on first use; commands are sent one at a time
+    and the connection is reopened after a network error.
+    """
+
+    key_prefix = "todo:state:"
+
+    def __init__(self, url: str, ttl: float, timeout: float = 5) -> None:
+        parsed = urlparse(url)
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port or 6379
+        self._password = parsed.password
+        self._db = int(parsed.path.lstrip("/") or 0)
+        self._ttl = int(ttl)
+        self._timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, tg_id: int) -> Optional[FSMState]:
+        raw = await self.execute("GET", f"{self.key_prefix}{tg_id}")
+        return FSMState.loads(raw) if raw is not None else None
+
+    async def set(self, tg_id: int, state: FSMState) -> None:
+        await self.execute("SET", f"{self.key_prefix}{tg_id}", state.dumps(), "EX", self._ttl)
+
+    async def delete(self, tg_id: int) -> None:
+        await self.execute("DEL", f"{self.key_prefix}{tg_id}")
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def execute(self, *args):
+        """
+        Send a command and return its reply.
+        """
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._execute(*args), self._timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                await self.close()
+                raise
+
+    async def _execute(self, *args):
+        if self._writer is None:
+            await self._connect()
+        return await self._send(*args)
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+        try:
+            if self._password:
+                await self._send("AUTH", self._password)
+            if self._db:
+                await self._send("SELECT", self._db)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _send(self, *args):
+        self._writer.write(_encode_command(args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self):
+        line = (await self._reader.readuntil(b"\r\n"))[:-2]
+        kind, payload = line[:1], line[1:]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+
+def _encode_command(args) -> bytes:
+    parts: List[bytes] = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(f"${len(value)}\r\n".encode() + value + b"\r\n")
+    return b"".join(parts)
+
+
+def create_state_store(url: str, ttl: float) -> StateStore:
+    """
+    Create the state storage for a URL: memory:// or redis://[:password@]host:port/db.
+    """
+    if url.startswith("redis://"):
+        return RedisStateStore(url, ttl)
+    return MemoryStateStore(ttl)
+
+
+state_store = create_state_store(STATE_STORE_URL, STATE_TTL)
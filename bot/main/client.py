@@ -1,44 +1,200 @@
 import asyncio
-from pathlib import Path
+import threading
+import time
 
 from pyrogram import Client
 from importlib import import_module
 
-from database.models import async_engine, Base
-from main.variables import APP_ID, API_HASH, BOT_TOKEN
+from database.migrations import migrate
+from database.models import async_engine
+from database.pool import pool_metrics
+from database.state import state_store
+from main.dispatcher import ShardedDispatcher
+from main.metrics import instrument_handler, registry, serve_metrics
+from main.reminders import reminder_scheduler
+from main.sender import SendScheduler
+from main.sharding import RoutingDispatcher, serve_routed_updates, socket_path
+from main.variables import (
+    APP_ID,
+    API_HASH,
+    BOT_TOKEN,
+    DB_POOL_METRICS_INTERVAL,
+    METRICS_HOST,
+    METRICS_PORT,
+    REMINDER_HORIZON,
+    UPDATE_WORKERS,
+    UPDATE_QUEUE_SIZE,
+    SEND_GLOBAL_RATE,
+    SEND_CHAT_RATE,
+    SEND_CHAT_BURST,
+    SEND_WORKERS,
+    SEND_MAX_RETRIES,
+    SEND_BROADCAST_RATE,
+    SHARD_WORKERS,
+    SHARD_INDEX,
+    SHARD_SOCKET_DIR,
+)
+
+IS_FRONT = SHARD_WORKERS > 0 and SHARD_INDEX < 0
+IS_WORKER = SHARD_WORKERS > 0 and SHARD_INDEX >= 0
 
 
 class ToDoApp(Client):
     """
     Custom Client class for the ToDo app.
+
+    With SHARD_WORKERS set, the front process (no SHARD_INDEX) only receives updates
+    and routes them to worker processes, which handle them without receiving updates
+    from Telegram themselves. Every worker sends the reminders of the users routed to it.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if IS_FRONT:
+            paths = [socket_path(SHARD_SOCKET_DIR, index) for index in range(SHARD_WORKERS)]
+            self.dispatcher = RoutingDispatcher(self, paths, queue_size=UPDATE_QUEUE_SIZE)
+        else:
+            self.dispatcher = ShardedDispatcher(self, queue_size=UPDATE_QUEUE_SIZE, routed=IS_WORKER)
+        self.sender = SendScheduler(
+            self,
+            global_rate=SEND_GLOBAL_RATE,
+            chat_rate=SEND_CHAT_RATE,
+            chat_burst=SEND_CHAT_BURST,
+            workers=SEND_WORKERS,
+            max_retries=SEND_MAX_RETRIES,
+            broadcast_rate=SEND_BROADCAST_RATE,
+        )
+        self._background_tasks = []
+        self.stopping = threading.Event()
+        self._metrics_server = None
+        self._routed_server = None
+        self._metrics_port = METRICS_PORT + SHARD_INDEX + 1 if IS_WORKER else METRICS_PORT
+
+    def on_message(self, filters=None, group: int = 0):
+        """
+        Register a message handler recording its latency.
+        """
+        return self._instrumented(super().on_message(filters, group))
+
+    def on_callback_query(self, filters=None, group: int = 0):
+        """
+        Register a callback query handler recording its latency.
+        """
+        return self._instrumented(super().on_callback_query(filters, group))
+
+    @staticmethod
+    def _instrumented(decorator):
+        def register(func):
+            decorator(instrument_handler(func))
+            return func
+        return register
+
     async def start(self: "pyrogram.Client"):
         """
         Start the ToDo app.
         """
-        await asyncio.gather(self.create_table())
+        started = time.monotonic()
+        if not IS_FRONT:
+            await asyncio.gather(self.migrate_database())
         await super().start()
+        if IS_WORKER:
+            path = socket_path(SHARD_SOCKET_DIR, SHARD_INDEX)
+            self._routed_server = await serve_routed_updates(self.dispatcher, path)
+        if not IS_FRONT:
+            await self.sender.start()
+            if DB_POOL_METRICS_INTERVAL > 0:
+                self._background_tasks.append(asyncio.create_task(self.report_pool_metrics()))
+            if REMINDER_HORIZON > 0:
+                self._background_tasks.append(asyncio.create_task(reminder_scheduler.run(self.sender)))
+        if METRICS_PORT > 0:
+            await self.start_metrics_server()
+        print(f"Started in {time.monotonic() - started:.2f} s")
 
-    async def create_table(self):
+    async def stop(self, *args, **kwargs):
         """
-        Create database tables.
+        Stop background tasks and the ToDo app. Sets `stopping` first, so worker processes
+        are no longer restarted while the app drains.
+        """
+        self.stopping.set()
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks.clear()
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            await self._metrics_server.wait_closed()
+            self._metrics_server = None
+        return await super().stop(*args, **kwargs)
+
+    async def terminate(self, *args, **kwargs):
+        """
+        Stop intake, drain queued updates and in-flight handlers, send queued messages,
+        then release the state store and the database pool before disconnecting.
+        """
+        if self._routed_server is not None:
+            self._routed_server.close()
+            await self._routed_server.wait_closed()
+            self._routed_server = None
+        result = await super().terminate(*args, **kwargs)
+        await self.sender.stop()
+        await state_store.close()
+        await async_engine.dispose()
+        return result
+
+    async def migrate_database(self):
+        """
+        Apply pending database migrations.
         """
         try:
-            async with async_engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
+            applied = await migrate(async_engine)
+            if applied:
+                print(f"Applied database migrations: {applied}")
         except Exception as e:
-            print(f"Error creating database tables: {e}")
+            print(f"Error migrating database: {e}")
+
+    async def start_metrics_server(self):
+        """
+        Serve metrics in Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics.
+        Worker processes use the following ports, one per SHARD_INDEX.
+        """
+        try:
+            self._metrics_server = await serve_metrics(METRICS_HOST, self._metrics_port)
+            print(f"Serving metrics on http://{METRICS_HOST}:{self._metrics_port}/metrics")
+        except OSError as e:
+            print(f"Error starting metrics server: {e}")
+
+    async def report_pool_metrics(self):
+        """
+        Periodically print database connection pool metrics.
+        """
+        while True:
+            await asyncio.sleep(DB_POOL_METRICS_INTERVAL)
+            print(f"Database pool: {pool_metrics.snapshot(async_engine.pool)}")
+
+
+registry.gauge(
+    "todo_db_pool",
+    "Database connection pool state and counters.",
+    ("field",),
+    collect=lambda: {(key,): value for key, value in pool_metrics.snapshot(async_engine.pool).items()},
+)
+
+HANDLER_MODULES = [
+    "todo.handlers",
+]
 
 app = ToDoApp(
-    "todo_bot",
+    "todo_bot" if SHARD_INDEX < 0 else f"todo_bot_worker_{SHARD_INDEX}",
     api_id=APP_ID,
     api_hash=API_HASH,
     bot_token=BOT_TOKEN,
+    workers=UPDATE_WORKERS,
+    no_updates=IS_WORKER,
+    # Raise every FloodWait instead of sleeping inside the call, so the send scheduler
+    # pauses only the flooded chat and keeps its send workers free.
+    sleep_threshold=0,
 )
 
-for file_handlers in Path("./").rglob("handlers.py"):
-    module_path = ".".join(file_handlers.parts[1:-1])+ ".handlers"
-
-    print(module_path)
-    import_module(module_path)
+if not IS_FRONT:
+    for module_path in HANDLER_MODULES:
+        import_module(module_path)
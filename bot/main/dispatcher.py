@@ -0,0 +1,176 @@
+import asyncio
+import inspect
+import logging
+from typing import List, Optional
+
+import pyrogram
+from pyrogram.dispatcher import Dispatcher
+from pyrogram.handlers import RawUpdateHandler
+from pyrogram.raw.types import PeerUser
+
+from main.metrics import sharded_updates_dropped
+
+log = logging.getLogger(__name__)
+
+
+def update_user_id(update) -> Optional[int]:
+    """
+    Get the Telegram ID of the user who caused a raw update.
+    """
+    user_id = getattr(update, "user_id", None)
+    if user_id is not None:
+        return user_id
+    message = getattr(update, "message", None)
+    for peer in (getattr(message, "from_id", None), getattr(message, "peer_id", None)):
+        if isinstance(peer, PeerUser):
+            return peer.user_id
+    return None
+
+
+class ShardedDispatcher(Dispatcher):
+    """
+    Dispatcher that routes updates to worker shards by user Telegram ID.
+
+    Updates of one user always land on the same shard and are handled in order,
+    while different users are handled concurrently. The router never waits for a
+    shard: updates for a shard with `queue_size` updates already queued are dropped
+    and counted, so a slow shard only delays its own users. A routed dispatcher also runs on a client without updates of its own and is
+    fed by put() with updates forwarded from a front process.
+    """
+
+    def __init__(self, client: "pyrogram.Client", queue_size: int = 100, routed: bool = False):
+        super().__init__(client)
+        self.queue_size = queue_size
+        self.routed = routed
+        self.shard_queues: List[asyncio.Queue] = []
+        self.router_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.routed or not self.client.no_updates
+
+    async def start(self):
+        if not self.enabled:
+            return
+        for _ in range(self.client.workers):
+            queue = asyncio.Queue()
+            lock = asyncio.Lock()
+            self.shard_queues.append(queue)
+            self.locks_list.append(lock)
+            self.handler_worker_tasks.append(self.loop.create_task(self.shard_worker(queue, lock)))
+        self.router_task = self.loop.create_task(self.route_updates())
+        log.info("Started %s sharded HandlerTasks", self.client.workers)
+
+    async def stop(self):
+        if not self.enabled:
+            return
+        self.updates_queue.put_nowait(None)
+        await self.router_task
+        for task in self.handler_worker_tasks:
+            await task
+        self.router_task = None
+        self.handler_worker_tasks.clear()
+        self.shard_queues.clear()
+        self.locks_list.clear()
+        self.groups.clear()
+        log.info("Stopped %s sharded HandlerTasks", self.client.workers)
+
+    def shard_for(self, update) -> int:
+        """
+        Get the shard index for a raw update.
+        """
+        user_id = update_user_id(update)
+        return user_id % len(self.shard_queues) if user_id is not None else 0
+
+    def put(self, packet) -> None:
+        """
+        Queue a raw update packet directly to the shard of its user, dropping it if the shard is full.
+        """
+        shard = self.shard_for(packet[0])
+        queue = self.shard_queues[shard]
+        if queue.qsize() >= self.queue_size:
+            sharded_updates_dropped.inc(str(shard))
+            return
+        queue.put_nowait(packet)
+
+    async def route_updates(self):
+        """
+        Move updates from the client queue to the shard queue of their user.
+        """
+        while True:
+            packet = await self.updates_queue.get()
+            if packet is None:
+                while not self.updates_queue.empty():
+                    packet = self.updates_queue.get_nowait()
+                    if packet is not None:
+                        self.put(packet)
+                for queue in self.shard_queues:
+                    queue.put_nowait(None)
+                break
+            self.put(packet)
+
+    async def shard_worker(self, queue: asyncio.Queue, lock: asyncio.Lock):
+        """
+        Handle updates of one shard one at a time.
+        """
+        while True:
+            packet = await queue.get()
+            if packet is None:
+                break
+            try:
+                await self.handle_packet(packet, lock)
+            except pyrogram.StopPropagation:
+                pass
+            except Exception as e:
+                log.exception(e)
+
+    async def handle_packet(self, packet, lock: asyncio.Lock):
+        """
+        Parse a raw update and run the first matching handler of every group.
+        """
+        update, users, chats = packet
+        parser = self.update_parsers.get(type(update), None)
+
+        parsed_update, handler_type = (
+            await parser(update, users, chats)
+            if parser is not None
+            else (None, type(None))
+        )
+
+        async with lock:
+            for group in self.groups.values():
+                for handler in group:
+                    args = None
+
+                    if isinstance(handler, handler_type):
+                        try:
+                            if await handler.check(self.client, parsed_update):
+                                args = (parsed_update,)
+                        except Exception as e:
+                            log.exception(e)
+                            continue
+
+                    elif isinstance(handler, RawUpdateHandler):
+                        args = (update, users, chats)
+
+                    if args is None:
+                        continue
+
+                    try:
+                        if inspect.iscoroutinefunction(handler.callback):
+                            await handler.callback(self.client, *args)
+                        else:
+                            await self.loop.run_in_executor(
+                                self.client.executor,
+                                handler.callback,
+                                self.client,
+                                *args
+                            )
+                    except pyrogram.StopPropagation:
+                        raise
+                    except pyrogram.ContinuePropagation:
+                        continue
+                    except Exception as e:
+                        log.exception(e)
+
+                    break
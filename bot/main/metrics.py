@@ -0,0 +1,302 @@
+import asyncio
+import functools
+import inspect
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from pyrogram import ContinuePropagation, StopPropagation
+
+LabelValues = Tuple[str, ...]
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Metric:
+    """
+    Base class for metrics with a fixed set of label names.
+    """
+    type_name = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+
+    def render(self) -> List[str]:
+        """
+        Render the metric in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError("Subclasses must implement _samples.")
+
+    def _format_labels(self, values: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labels, values)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing counter.
+    """
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(labels)} {_number(value)}" for labels, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down, such as the number of calls in flight.
+    """
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Tuple[str, ...] = (),
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ) -> None:
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> List[str]:
+        values = self._collect() if self._collect else self._values
+        return [f"{self.name}{self._format_labels(labels)} {_number(value)}" for labels, value in values.items()]
+
+
+class Summary(Metric):
+    """
+    Latency distribution with p50/p95/p99 over a sliding window of recent observations.
+
+    Sum and count cover every observation, so rates and averages stay exact;
+    quantiles are computed on scrape from the last `window` observations per label set.
+    """
+    type_name = "summary"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), window: int = 1024) -> None:
+        super().__init__(name, description, labels)
+        self._window = window
+        self._observations: Dict[LabelValues, Deque[float]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+        self._counts: Dict[LabelValues, int] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        observations = self._observations.get(labels)
+        if observations is None:
+            observations = self._observations[labels] = deque(maxlen=self._window)
+        observations.append(value)
+        self._sums[labels] = self._sums.get(labels, 0.0) + value
+        self._counts[labels] = self._counts.get(labels, 0) + 1
+
+    def quantile(self, q: float, *labels: str) -> float:
+        return _quantile(sorted(self._observations.get(labels, ())), q)
+
+    def count(self, *labels: str) -> int:
+        return self._counts.get(labels, 0)
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """
+        Observe the time spent inside the block.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for labels, observations in self._observations.items():
+            ordered = sorted(observations)
+            for q in QUANTILES:
+                label_text = self._format_labels(labels, {"quantile": str(q)})
+                lines.append(f"{self.name}{label_text} {_number(_quantile(ordered, q))}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {_number(self._sums[labels])}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {self._counts[labels]}")
+        return lines
+
+
+class Registry:
+    """
+    Collection of metrics rendered together on the metrics endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, description, labels))
+
+    def gauge(self, name: str, description: str, labels: Tuple[str, ...] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, description, labels, collect))
+
+    def summary(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Summary:
+        return self.register(Summary(name, description, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+handler_seconds = registry.summary("todo_handler_seconds", "Update handler latency.", ("handler",))
+handler_errors = registry.counter("todo_handler_errors_total", "Update handlers failed with an exception.", ("handler",))
+handlers_in_flight = registry.gauge("todo_handlers_in_flight", "Update handlers running now.", ("handler",))
+
+repository_seconds = registry.summary("todo_repository_seconds", "Repository method latency.", ("method",))
+repository_errors = registry.counter("todo_repository_errors_total", "Repository methods failed with an exception.", ("method",))
+repository_in_flight = registry.gauge("todo_repository_in_flight", "Repository methods running now.", ("method",))
+
+query_seconds = registry.summary("todo_db_query_seconds", "SQL statement execution time.", ("statement",))
+slow_queries = registry.counter("todo_db_slow_queries_total", "SQL statements slower than the slow query threshold.")
+session_seconds = registry.summary("todo_db_connection_hold_seconds", "Time a database connection is held between checkout and checkin.")
+connections_in_use = registry.gauge("todo_db_connections_in_use", "Database connections checked out of the pool.")
+
+send_seconds = registry.summary("todo_telegram_call_seconds", "Telegram API call latency.", ("method",))
+send_errors = registry.counter("todo_telegram_call_errors_total", "Telegram API calls failed after retries.", ("method",))
+send_flood_waits = registry.counter("todo_telegram_flood_waits_total", "FloodWait errors returned by Telegram.", ("method",))
+send_queue_pending = registry.gauge("todo_telegram_calls_pending", "Telegram API calls waiting in the send queue.")
+routed_updates_dropped = registry.counter("todo_routed_updates_dropped_total", "Updates dropped for a worker with a full queue.", ("worker",))
+sharded_updates_dropped = registry.counter("todo_sharded_updates_dropped_total", "Updates dropped for a shard with a full queue.", ("shard",))
+
+
+def instrument_handler(func: Callable) -> Callable:
+    """
+    Wrap an update handler to record its latency, errors and calls in flight.
+    Propagation control exceptions raised by handlers are not counted as errors.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        handlers_in_flight.inc(name)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except (StopPropagation, ContinuePropagation):
+            raise
+        except Exception:
+            handler_errors.inc(name)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, name)
+            handlers_in_flight.dec(name)
+    return wrapper
+
+
+def instrument_static_methods(cls: type) -> type:
+    """
+    Class decorator recording latency, errors and calls in flight of every public async static method.
+    """
+    for attribute, value in list(vars(cls).items()):
+        if attribute.startswith("_") or not isinstance(value, staticmethod):
+            continue
+        if not inspect.iscoroutinefunction(value.__func__):
+            continue
+        setattr(cls, attribute, staticmethod(_instrument_method(value.__func__)))
+    return cls
+
+
+def _instrument_method(func: Callable) -> Callable:
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        repository_in_flight.inc(name)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            repository_errors.inc(name)
+            raise
+        finally:
+            repository_seconds.observe(time.perf_counter() - started, name)
+            repository_in_flight.dec(name)
+    return wrapper
+
+
+async def serve_metrics(host: str, port: int) -> asyncio.AbstractServer:
+    """
+    Start an HTTP server answering GET /metrics with the registry in Prometheus text format.
+    """
+    return await asyncio.start_server(_handle_http, host, port)
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", registry.render().encode()
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return math.nan
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
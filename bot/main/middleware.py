@@ -1,3 +1,5 @@
+import functools
+
 from pyrogram import Client
 from pyrogram.types import Message
 
@@ -5,10 +7,11 @@ from database.repository import Repository
 
 
 def get_user(func):
+    @functools.wraps(func)
     async def wrapper(client: Client, message: Message, *args, **kwargs):
         user = await Repository.get_user(tg_id=message.from_user.id)
         if user:
             return await func(client, message, *args, user=user, **kwargs)
         else:
-            await message.reply_text("Введите команду /start для начала работы")
+            client.sender.send_message(message.from_user.id, "Введите команду /start для начала работы")
     return wrapper
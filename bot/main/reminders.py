@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import Callable, List, Optional, Tuple
+
+from database.repository import Repository
+from main.sharding import HashRing
+from main.variables import REMINDER_HORIZON, REMINDER_BATCH_SIZE, SHARD_WORKERS, SHARD_INDEX
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class ReminderScheduler:
+    """
+    Deliver task reminders through the send scheduler.
+
+    Reminders due within the horizon are loaded from the remind_at index in batches
+    and kept in a heap ordered by time, at most `capacity` at once, so memory stays
+    bounded however many reminders are pending. The loaded window is rebuilt every
+    horizon to pick up reminders set by other processes. Due reminders are claimed
+    with an atomic UPDATE, so a reminder loaded twice is still sent once.
+
+    With `owns` set, only reminders of users it accepts by Telegram ID are kept. Every
+    worker process runs a scheduler for the users it owns, so reminders set or imported
+    in a worker are scheduled by that worker right away.
+    """
+
+    def __init__(self, horizon: float, capacity: int, owns: Optional[Callable[[int], bool]] = None) -> None:
+        self._horizon = timedelta(seconds=horizon)
+        self._capacity = capacity
+        self._owns = owns
+        self._heap: List[Tuple[datetime, int]] = []
+        self._cursor: Tuple[datetime, int] = (EPOCH, 0)
+        self._loaded_until = EPOCH
+        self._rescan_at = EPOCH
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def notify(self, task_id: int, remind_at: datetime) -> None:
+        """
+        Schedule a reminder just set by a user if it falls into the loaded window.
+        Later reminders are loaded when the window reaches them.
+        """
+        if remind_at < self._loaded_until:
+            heapq.heappush(self._heap, (remind_at, task_id))
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def reload(self) -> None:
+        """
+        Rebuild the loaded window on the next tick, after many reminders were added at once.
+        """
+        self._rescan_at = EPOCH
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self, sender) -> None:
+        """
+        Load, wait for and send reminders until cancelled.
+        """
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await self._tick(sender)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error sending reminders: {e}")
+                await asyncio.sleep(5)
+
+    async def _tick(self, sender) -> None:
+        now = datetime.now(timezone.utc)
+        if now >= self._rescan_at:
+            self._heap.clear()
+            self._cursor, self._loaded_until = (EPOCH, 0), EPOCH
+            self._rescan_at = now + self._horizon
+        if self._loaded_until - now < self._horizon / 2:
+            await self._load(now)
+        due = set()
+        while self._heap and self._heap[0][0] <= now and len(due) < self._capacity:
+            due.add(heapq.heappop(self._heap)[1])
+        if due:
+            for reminder in await Repository.claim_reminders(list(due), now):
+                sender.send_message(reminder.tg_id, render_reminder(reminder.title, reminder.due_at))
+            return
+        wake_at = self._rescan_at
+        if len(self._heap) < self._capacity:
+            wake_at = min(wake_at, self._loaded_until - self._horizon / 2)
+        if self._heap:
+            wake_at = min(wake_at, self._heap[0][0])
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), max((wake_at - now).total_seconds(), 0.05))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _load(self, now: datetime) -> None:
+        """
+        Load the next batch of reminders due before the end of the horizon.
+        """
+        limit = self._capacity - len(self._heap)
+        if limit <= 0:
+            return
+        until = now + self._horizon
+        rows = await Repository.get_upcoming_reminders(until, *self._cursor, limit)
+        for row in rows:
+            if self._owns is None or self._owns(row.tg_id):
+                heapq.heappush(self._heap, (row.remind_at, row.id))
+        if rows:
+            self._cursor = (rows[-1].remind_at, rows[-1].id)
+        self._loaded_until = until if len(rows) < limit else rows[-1].remind_at
+
+
+def render_reminder(title: str, due_at: Optional[datetime]) -> str:
+    """
+    Render the reminder message of a task.
+    """
+    text = f"⏰ Reminder: <b>{escape(title)}</b>"
+    if due_at is not None:
+        text += f"\nDue: {due_at.astimezone(timezone.utc):%Y-%m-%d %H:%M} UTC"
+    return text
+
+
+def shard_owner(workers: int, index: int) -> Optional[Callable[[int], bool]]:
+    """
+    Get a filter accepting Telegram IDs routed to the worker process with the given index,
+    or None outside a sharded worker.
+    """
+    if workers <= 0 or index < 0:
+        return None
+    ring = HashRing(range(workers))
+    return lambda tg_id: ring.node_for(tg_id) == index
+
+
+reminder_scheduler = ReminderScheduler(REMINDER_HORIZON, REMINDER_BATCH_SIZE, shard_owner(SHARD_WORKERS, SHARD_INDEX))
@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from pyrogram.errors import FloodWait
+
+from main.metrics import send_errors, send_flood_waits, send_queue_pending, send_seconds
+
+log = logging.getLogger(__name__)
+
+MESSAGE_LENGTH_LIMIT = 4096
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def delay(self) -> float:
+        """
+        Get seconds to wait until a token is available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        """
+        Take one token from the bucket.
+        """
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back all tokens for the given time.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+@dataclass
+class SendJob:
+    """
+    Telegram API call waiting in the send queue.
+    """
+    method: str
+    kwargs: dict
+    coalesce: bool = False
+    limited: bool = True
+    attempts: int = 0
+    futures: List[asyncio.Future] = field(default_factory=list)
+
+
+class SendScheduler:
+    """
+    Central queue for outgoing Telegram calls.
+
+    Calls are queued per chat and executed in order by a pool of workers,
+    respecting a global and a per-chat token bucket. A FloodWait pauses the bucket of
+    its chat and puts the call back at the head of the chat queue until the delay given
+    by the server is over, so workers keep serving other chats; only when several chats
+    are in flood wait at once is the limit treated as global and all sends paused.
+    The client must be created with sleep_threshold=0, or Pyrogram sleeps through short
+    flood waits inside the call.
+    Queued plain text messages to one chat
+    are coalesced into a single message. Broadcasts to many chats are released into
+    the queues at their own rate, so they use a bounded share of the global budget.
+    """
+
+    def __init__(
+        self,
+        client,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        workers: int = 4,
+        max_retries: int = 3,
+        broadcast_rate: float = 10,
+        global_flood_chats: int = 3,
+    ) -> None:
+        self._client = client
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, Deque[SendJob]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers_count = workers
+        self._workers: List[asyncio.Task] = []
+        self._max_retries = max_retries
+        self._global_flood_chats = global_flood_chats
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._broadcast_bucket = TokenBucket(broadcast_rate, broadcast_rate)
+        self._broadcasts: Deque[Tuple[int, SendJob]] = deque()
+        self._broadcast_ready: Optional[asyncio.Event] = None
+
+    def send_message(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """
+        Queue a text message. Messages without extra options may be coalesced.
+        """
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        return self.submit("send_message", chat_id, coalesce=not kwargs, text=text, **kwargs)
+
+    def send_document(self, chat_id: int, document: str, **kwargs) -> asyncio.Future:
+        """
+        Queue a document upload from a file path.
+        """
+        return self.submit("send_document", chat_id, document=document, **kwargs)
+
+    def edit_message_text(self, chat_id: int, message_id: int, text: str, **kwargs) -> asyncio.Future:
+        """
+        Queue an edit of a message text.
+        """
+        return self.submit("edit_message_text", chat_id, message_id=message_id, text=text, **kwargs)
+
+    def edit_message_reply_markup(self, chat_id: int, message_id: int, reply_markup) -> asyncio.Future:
+        """
+        Queue an edit of a message inline keyboard.
+        """
+        return self.submit("edit_message_reply_markup", chat_id, message_id=message_id, reply_markup=reply_markup)
+
+    def answer_callback_query(self, call, text: str = None, **kwargs) -> asyncio.Future:
+        """
+        Queue an answer to a callback query. Answers are not limited by the chat bucket.
+        """
+        return self.submit(
+            "answer_callback_query", call.from_user.id, limited=False,
+            callback_query_id=call.id, text=text, **kwargs
+        )
+
+    def broadcast(self, chat_ids: Iterable[int], text: str) -> None:
+        """
+        Queue a plain text message to many chats without waiting for it to be sent.
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        for chat_id in chat_ids:
+            future = loop.create_future()
+            future.add_done_callback(_consume_exception)
+            job = SendJob("send_message", {"chat_id": chat_id, "text": text}, coalesce=True, futures=[future])
+            self._broadcasts.append((chat_id, job))
+            self._pending += 1
+        if self._broadcasts:
+            send_queue_pending.set(self._pending)
+            self._idle.clear()
+            self._broadcast_ready.set()
+
+    def submit(self, method: str, chat_id: int, coalesce: bool = False, limited: bool = True, **kwargs) -> asyncio.Future:
+        """
+        Queue a client method call for the chat and return a future with its result.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        if method != "answer_callback_query":
+            kwargs["chat_id"] = chat_id
+        self._pending += 1
+        send_queue_pending.set(self._pending)
+        self._idle.clear()
+        self._enqueue(chat_id, SendJob(method, kwargs, coalesce=coalesce, limited=limited, futures=[future]))
+        return future
+
+    def _enqueue(self, chat_id: int, job: SendJob) -> None:
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+            self._ready.put_nowait(chat_id)
+        queue.append(job)
+
+    async def start(self) -> None:
+        """
+        Start send workers.
+        """
+        self._ensure_started()
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        Wait for queued calls to be sent and stop the workers.
+        """
+        if self._idle is not None and self._pending:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                log.warning("Dropping %s unsent Telegram calls", self._pending)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def _ensure_started(self) -> None:
+        if self._workers:
+            return
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._broadcast_ready = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._workers_count)]
+        self._workers.append(asyncio.create_task(self._release_broadcasts()))
+
+    async def _release_broadcasts(self) -> None:
+        """
+        Move broadcast messages into the chat queues no faster than the broadcast rate.
+        """
+        while True:
+            await self._broadcast_ready.wait()
+            while self._broadcasts:
+                delay = self._broadcast_bucket.delay()
+                if delay:
+                    await asyncio.sleep(delay)
+                    continue
+                self._broadcast_bucket.consume()
+                self._enqueue(*self._broadcasts.popleft())
+            self._broadcast_ready.clear()
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id = await self._ready.get()
+            queue = self._queues[chat_id]
+            await self._acquire(chat_id, queue[0].limited)
+            job = self._take(queue)
+            retry_after = await self._execute(chat_id, job)
+            if retry_after is not None:
+                queue.appendleft(job)
+                asyncio.get_running_loop().call_later(retry_after, self._ready.put_nowait, chat_id)
+                continue
+            self._pending -= len(job.futures)
+            send_queue_pending.set(self._pending)
+            if queue:
+                self._ready.put_nowait(chat_id)
+            else:
+                del self._queues[chat_id]
+                asyncio.get_running_loop().call_later(
+                    self._chat_burst / self._chat_rate, self._drop_chat_bucket, chat_id
+                )
+            if not self._pending:
+                self._idle.set()
+
+    def _drop_chat_bucket(self, chat_id: int) -> None:
+        """
+        Forget the bucket of an idle chat once it would have refilled anyway.
+        """
+        if chat_id not in self._queues:
+            self._chat_buckets.pop(chat_id, None)
+
+    def _take(self, queue: Deque[SendJob]) -> SendJob:
+        """
+        Pop the next job, merging following plain text messages into it.
+        """
+        job = queue.popleft()
+        if not job.coalesce:
+            return job
+        texts = [job.kwargs["text"]]
+        length = len(texts[0])
+        while queue and queue[0].coalesce:
+            text = queue[0].kwargs["text"]
+            length += len(text) + 2
+            if length > MESSAGE_LENGTH_LIMIT:
+                break
+            texts.append(text)
+            job.futures.extend(queue.popleft().futures)
+        job.kwargs["text"] = "\n\n".join(texts)
+        return job
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self._chat_rate, self._chat_burst)
+        return bucket
+
+    async def _acquire(self, chat_id: int, limited: bool) -> None:
+        chat_bucket = self._chat_bucket(chat_id) if limited else None
+        while True:
+            delay = max(self._global_bucket.delay(), chat_bucket.delay() if chat_bucket else 0.0)
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+        self._global_bucket.consume()
+        if chat_bucket:
+            chat_bucket.consume()
+
+    async def _execute(self, chat_id: int, job: SendJob) -> Optional[float]:
+        """
+        Make the call and resolve its futures. Returns the delay before retrying after a FloodWait.
+        """
+        try:
+            with send_seconds.time(job.method):
+                result = await getattr(self._client, job.method)(**job.kwargs)
+        except FloodWait as e:
+            send_flood_waits.inc(job.method)
+            if job.attempts >= self._max_retries:
+                return _fail(job, e)
+            job.attempts += 1
+            self._pause(chat_id, e.value)
+            return e.value
+        except Exception as e:
+            return _fail(job, e)
+        for future in job.futures:
+            if not future.done():
+                future.set_result(result)
+        return None
+
+    def _pause(self, chat_id: int, seconds: float) -> None:
+        """
+        Hold back sends to a chat in flood wait, and to all chats if several are in flood wait at once.
+        """
+        self._chat_bucket(chat_id).pause(seconds)
+        now = time.monotonic()
+        if sum(bucket.paused_until > now for bucket in self._chat_buckets.values()) >= self._global_flood_chats:
+            self._global_bucket.pause(seconds)
+
+
+def _fail(job: SendJob, error: Exception) -> None:
+    send_errors.inc(job.method)
+    log.error("Telegram call %s failed: %s", job.method, error)
+    for future in job.futures:
+        if not future.done():
+            future.set_exception(error)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
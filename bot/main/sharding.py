@@ -0,0 +1,195 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import struct
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pyrogram
+from pyrogram.dispatcher import Dispatcher
+from pyrogram.raw.core import TLObject
+
+from main.dispatcher import update_user_id
+from main.metrics import routed_updates_dropped
+
+log = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct(">I")
+PACKET_HEADER = struct.Struct(">II")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes.
+
+    Every node is placed on the ring many times, so keys spread evenly and
+    adding or removing a node only moves the keys of that node.
+    """
+
+    def __init__(self, nodes: Sequence[int], replicas: int = 64) -> None:
+        points = sorted((_hash(f"{node}:{replica}"), node) for node in nodes for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: int) -> int:
+        """
+        Get the node owning a key.
+        """
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._nodes[index]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def socket_path(directory: str, index: int) -> str:
+    """
+    Get the unix socket path of a worker process.
+    """
+    return os.path.join(directory, f"todo_bot-{index}.sock")
+
+
+def encode_packet(update: TLObject, users: Dict[int, TLObject], chats: Dict[int, TLObject]) -> bytes:
+    """
+    Serialize a raw update with its users and chats in the Telegram TL format.
+    """
+    parts = [update.write(), *(user.write() for user in users.values()), *(chat.write() for chat in chats.values())]
+    return PACKET_HEADER.pack(len(users), len(chats)) + b"".join(FRAME_HEADER.pack(len(part)) + part for part in parts)
+
+
+def decode_packet(data: bytes) -> Tuple[TLObject, Dict[int, TLObject], Dict[int, TLObject]]:
+    """
+    Deserialize a packet written by encode_packet.
+    """
+    stream = BytesIO(data)
+    users_count, chats_count = PACKET_HEADER.unpack(stream.read(PACKET_HEADER.size))
+    objects = []
+    for _ in range(1 + users_count + chats_count):
+        (length,) = FRAME_HEADER.unpack(stream.read(FRAME_HEADER.size))
+        objects.append(TLObject.read(BytesIO(stream.read(length))))
+    update, users, chats = objects[0], objects[1:1 + users_count], objects[1 + users_count:]
+    return update, {user.id: user for user in users}, {chat.id: chat for chat in chats}
+
+
+class RoutingDispatcher(Dispatcher):
+    """
+    Dispatcher of the front process that forwards raw updates to worker processes.
+
+    Each update goes to the worker owning its user on a consistent hash ring, so all
+    updates of one user are handled by one worker in the order they arrived. Every
+    worker has an outbound queue drained by its own task. The router never waits for
+    a worker: updates for a worker with `queue_size` updates already queued are
+    dropped and counted, so a slow or dead worker only loses its own users' updates.
+    """
+
+    def __init__(
+        self, client: "pyrogram.Client", socket_paths: List[str], queue_size: int = 1000, stop_timeout: float = 10
+    ):
+        super().__init__(client)
+        self.socket_paths = socket_paths
+        self.ring = HashRing(range(len(socket_paths)))
+        self.queue_size = queue_size
+        self.stop_timeout = stop_timeout
+        self.stopping = False
+        self.worker_queues: List[asyncio.Queue] = []
+        self.forward_tasks: List[asyncio.Task] = []
+        self.router_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.client.no_updates:
+            return
+        self.stopping = False
+        for path in self.socket_paths:
+            queue = asyncio.Queue()
+            self.worker_queues.append(queue)
+            self.forward_tasks.append(self.loop.create_task(self.forward_updates(path, queue)))
+        self.router_task = self.loop.create_task(self.route_updates())
+        log.info("Routing updates to %s workers", len(self.socket_paths))
+
+    async def stop(self):
+        if self.client.no_updates:
+            return
+        self.stopping = True
+        self.updates_queue.put_nowait(None)
+        await self.router_task
+        _, pending = await asyncio.wait(self.forward_tasks, timeout=self.stop_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+            log.warning("Stopped forwarding to %s unresponsive workers", len(pending))
+        self.router_task = None
+        self.forward_tasks.clear()
+        self.worker_queues.clear()
+        self.groups.clear()
+        log.info("Stopped routing updates")
+
+    async def route_updates(self):
+        """
+        Move updates from the client queue to the queue of the worker owning their user.
+        """
+        while True:
+            packet = await self.updates_queue.get()
+            if packet is None:
+                for queue in self.worker_queues:
+                    queue.put_nowait(None)
+                break
+            user_id = update_user_id(packet[0])
+            worker = self.ring.node_for(user_id if user_id is not None else 0)
+            queue = self.worker_queues[worker]
+            if queue.qsize() >= self.queue_size:
+                routed_updates_dropped.inc(str(worker))
+                continue
+            queue.put_nowait(encode_packet(*packet))
+
+    async def forward_updates(self, path: str, queue: asyncio.Queue):
+        """
+        Write queued updates to a worker socket, reconnecting until the worker is back
+        or the dispatcher is stopping.
+        """
+        writer: Optional[asyncio.StreamWriter] = None
+        data = await queue.get()
+        while data is not None:
+            try:
+                if writer is None:
+                    _, writer = await asyncio.open_unix_connection(path)
+                writer.write(FRAME_HEADER.pack(len(data)) + data)
+                await writer.drain()
+            except OSError as e:
+                log.warning("Worker %s unavailable: %s", path, e)
+                if writer is not None:
+                    writer.close()
+                    writer = None
+                if self.stopping:
+                    log.warning("Dropped %s updates queued for %s", queue.qsize(), path)
+                    return
+                await asyncio.sleep(1)
+                continue
+            data = await queue.get()
+        if writer is not None:
+            writer.close()
+            await writer.wait_closed()
+
+
+async def serve_routed_updates(dispatcher, path: str) -> asyncio.AbstractServer:
+    """
+    Accept updates forwarded by the front process on a unix socket and queue them to the dispatcher.
+    Updates for a full shard are dropped by the dispatcher, so one slow shard does not stop reading.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                dispatcher.put(decode_packet(await reader.readexactly(length)))
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    return await asyncio.start_unix_server(handle, path)
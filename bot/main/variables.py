@@ -14,4 +14,50 @@ DB_USER=os.getenv("DB_USER")
 DB_PASS=os.getenv("DB_PASS")
 DB_NAME=os.getenv("DB_NAME")
 
-DB_URL =f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
\ No newline at end of file
+DB_URL =f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+TASKS_PAGE_SIZE=int(os.getenv("TASKS_PAGE_SIZE", 5))
+TASK_CARD_DESCRIPTION_LENGTH=int(os.getenv("TASK_CARD_DESCRIPTION_LENGTH", 200))
+
+USER_CACHE_SIZE=int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL=float(os.getenv("USER_CACHE_TTL", 300))
+LOGIN_CACHE_SIZE=int(os.getenv("LOGIN_CACHE_SIZE", 100000))
+LOGIN_CACHE_TTL=float(os.getenv("LOGIN_CACHE_TTL", 3600))
+SELECTION_CACHE_SIZE=int(os.getenv("SELECTION_CACHE_SIZE", 10000))
+SELECTION_TTL=float(os.getenv("SELECTION_TTL", 3600))
+
+DB_POOL_SIZE=int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW=int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT=float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE=int(os.getenv("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING=os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE=int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+DB_COMMAND_TIMEOUT=float(os.getenv("DB_COMMAND_TIMEOUT", 30))
+DB_POOL_METRICS_INTERVAL=float(os.getenv("DB_POOL_METRICS_INTERVAL", 0))
+
+UPDATE_WORKERS=int(os.getenv("UPDATE_WORKERS", min(32, (os.cpu_count() or 0) + 4)))
+UPDATE_QUEUE_SIZE=int(os.getenv("UPDATE_QUEUE_SIZE", 100))
+
+SEND_GLOBAL_RATE=float(os.getenv("SEND_GLOBAL_RATE", 30))
+SEND_CHAT_RATE=float(os.getenv("SEND_CHAT_RATE", 1))
+SEND_CHAT_BURST=float(os.getenv("SEND_CHAT_BURST", 3))
+SEND_WORKERS=int(os.getenv("SEND_WORKERS", 4))
+SEND_MAX_RETRIES=int(os.getenv("SEND_MAX_RETRIES", 3))
+SEND_BROADCAST_RATE=float(os.getenv("SEND_BROADCAST_RATE", 10))
+
+STATE_STORE_URL=os.getenv("STATE_STORE_URL", "memory://")
+STATE_TTL=float(os.getenv("STATE_TTL", 86400))
+
+METRICS_HOST=os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT=int(os.getenv("METRICS_PORT", 9100))
+SLOW_QUERY_THRESHOLD=float(os.getenv("SLOW_QUERY_THRESHOLD", 0.2))
+
+REMINDER_HORIZON=float(os.getenv("REMINDER_HORIZON", 300))
+REMINDER_BATCH_SIZE=int(os.getenv("REMINDER_BATCH_SIZE", 1000))
+
+TRANSFER_BATCH_SIZE=int(os.getenv("TRANSFER_BATCH_SIZE", 1000))
+IMPORT_MAX_SIZE=int(os.getenv("IMPORT_MAX_SIZE", 5242880))
+
+SHARD_WORKERS=int(os.getenv("SHARD_WORKERS", 0))
+SHARD_INDEX=int(os.getenv("SHARD_INDEX", -1))
+SHARD_SOCKET_DIR=os.getenv("SHARD_SOCKET_DIR", "/tmp")
@@ -1,7 +1,51 @@
+import os
+import subprocess
 import sys
+import threading
 
 from main.client import app
+from main.variables import SHARD_WORKERS, SHARD_INDEX
+
+
+def spawn_worker(index):
+    """
+    Start the worker process of one shard, handling the updates routed to it by this process.
+    Workers run in their own session, so Ctrl+C reaches only this process and workers keep
+    handling the updates it drains until stop_workers asks them to exit.
+    """
+    env = dict(os.environ, SHARD_INDEX=str(index))
+    return subprocess.Popen([sys.executable, __file__], env=env, start_new_session=True)
+
+
+def supervise_workers(workers, stopping):
+    """
+    Restart worker processes that exited, so their part of the hash ring is not lost, until stopping is set.
+    """
+    while not stopping.wait(1):
+        for index, worker in enumerate(workers):
+            if worker.poll() is not None:
+                print(f"Worker {index} exited with code {worker.returncode}, restarting")
+                workers[index] = spawn_worker(index)
+
+
+def stop_workers(workers):
+    """
+    Ask worker processes to finish queued updates and exit, then wait for them.
+    """
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.wait()
+
 
 if __name__ == "__main__":
     print(__file__)
-    app.run()
+    workers = [spawn_worker(index) for index in range(SHARD_WORKERS)] if SHARD_WORKERS > 0 and SHARD_INDEX < 0 else []
+    supervisor = threading.Thread(target=supervise_workers, args=(workers, app.stopping), daemon=True)
+    supervisor.start()
+    try:
+        app.run()
+    finally:
+        app.stopping.set()
+        supervisor.join()
+        stop_workers(workers)
@@ -0,0 +1,4 @@
+import os
+
+# Modules build the database engine from DB_* variables on import; the tests never connect.
+os.environ.setdefault("DB_PORT", "5432")
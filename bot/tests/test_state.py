@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from database.models import StatesUserEnum
+import pytest
+
+from database.state import FSMState, RedisError, RedisStateStore
+
+
+class RespStandIn:
+    """
+    In-process server speaking the Redis protocol, supporting AUTH, GET, SET with EX and DEL.
+    """
+
+    def __init__(self, password: Optional[str] = None) -> None:
+        self.password = password
+        self.values: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    def url(self, password: Optional[str] = None) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"redis://:{password}@{host}:{port}/0" if password else f"redis://{host}:{port}/0"
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        authenticated = self.password is None
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args[0].upper() == b"AUTH":
+                    authenticated = self.password is not None and args[1].decode() == self.password
+                    reply = b"+OK\r\n" if authenticated else b"-WRONGPASS invalid password\r\n"
+                elif not authenticated:
+                    reply = b"-NOAUTH Authentication required.\r\n"
+                else:
+                    reply = self._reply(args)
+                writer.write(reply)
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> List[bytes]:
+        count = int((await reader.readuntil(b"\r\n"))[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readuntil(b"\r\n"))[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _reply(self, args: List[bytes]) -> bytes:
+        command = args[0].upper()
+        if command == b"GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET":
+            ttl = int(args[4]) if len(args) > 4 and args[3].upper() == b"EX" else None
+            self.values[args[1]] = (args[2], time.monotonic() + ttl if ttl is not None else None)
+            return b"+OK\r\n"
+        if command == b"DEL":
+            return b":%d\r\n" % sum(self.values.pop(key, None) is not None for key in args[1:])
+        return b"-ERR unknown command\r\n"
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+
+def run_with_store(scenario, ttl: float = 60, password: Optional[str] = None):
+    async def run():
+        server = RespStandIn(password)
+        await server.start()
+        store = RedisStateStore(server.url(password), ttl)
+        try:
+            await scenario(store, server)
+        finally:
+            await store.close()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_redis_state_store_get_set_delete():
+    async def scenario(store: RedisStateStore, server: RespStandIn):
+        assert await store.get(1) is None
+        state = FSMState(StatesUserEnum.UPDATE_TASK_TITLE, task_id=7, data={"title": "Пример"})
+        await store.set(1, state)
+        assert await store.get(1) == state
+        assert await store.get(2) is None
+        await store.delete(1)
+        assert await store.get(1) is None
+
+    run_with_store(scenario)
+
+
+def test_redis_state_store_expires_states():
+    async def scenario(store: RedisStateStore, server: RespStandIn):
+        await store.set(1, FSMState(StatesUserEnum.CREATE_TASK_TITLE))
+        assert await store.get(1) is not None
+        await asyncio.sleep(1.1)
+        assert await store.get(1) is None
+
+    run_with_store(scenario, ttl=1)
+
+
+def test_redis_state_store_reconnects_after_failed_auth():
+    async def scenario(store: RedisStateStore, server: RespStandIn):
+        server.password = "other"
+        with pytest.raises(RedisError):
+            await store.get(1)
+        server.password = "secret"
+        await store.set(1, FSMState(StatesUserEnum.CREATE_TASK_TITLE))
+        assert await store.get(1) is not None
+
+    run_with_store(scenario, password="secret")
@@ -1,4 +1,16 @@
-from pyrogram.types import KeyboardButton, ReplyKeyboardMarkup
+import base64
+import binascii
+import struct
+from enum import IntEnum
+from functools import lru_cache
+from typing import AbstractSet, Dict, List, Optional, Tuple, Union
+
+from pyrogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    KeyboardButton,
+    ReplyKeyboardMarkup,
+)
 
 BUTTONS_AFTER_REGISTRATION = [
     [
@@ -8,7 +20,12 @@ BUTTONS_AFTER_REGISTRATION = [
         KeyboardButton(
             text="/show tasks",
         ),
-    ]
+    ],
+    [
+        KeyboardButton(
+            text="/select tasks",
+        ),
+    ],
 ]
 
 REPLY_KEYBOARD = ReplyKeyboardMarkup(keyboard=[
@@ -18,3 +35,269 @@ REPLY_KEYBOARD = ReplyKeyboardMarkup(keyboard=[
         )
     ],
 ], resize_keyboard=True, one_time_keyboard=True, placeholder="Press any button")
+
+
+class CallbackOperation(IntEnum):
+    """
+    Operations of inline keyboard buttons, encoded into callback data.
+    """
+    UPDATE_TASK = 1
+    COMPLETE_TASK = 2
+    REMIND_TASK = 3
+    DELETE_TASK = 4
+    NEXT_PAGE = 5
+    PREV_PAGE = 6
+    FIND_PAGE = 7
+    SELECT_TASK = 8
+    UNSELECT_TASK = 9
+    SELECT_NEXT = 10
+    SELECT_PREV = 11
+    BULK_COMPLETE = 12
+    BULK_UNCOMPLETE = 13
+    BULK_DELETE = 14
+    BULK_SHARE = 15
+    SHARE_TO_LIST = 16
+
+
+CALLBACK_VERSION = 1
+CALLBACK = struct.Struct(">BBI")
+CALLBACK_LENGTH = 8
+
+OPERATIONS: Dict[int, CallbackOperation] = {operation.value: operation for operation in CallbackOperation}
+
+LEGACY_OPERATIONS = {
+    "updatetask": CallbackOperation.UPDATE_TASK,
+    "completetask": CallbackOperation.COMPLETE_TASK,
+    "remindtask": CallbackOperation.REMIND_TASK,
+    "deletetask": CallbackOperation.DELETE_TASK,
+    "nextpage": CallbackOperation.NEXT_PAGE,
+    "prevpage": CallbackOperation.PREV_PAGE,
+    "findpage": CallbackOperation.FIND_PAGE,
+    "selecttask": CallbackOperation.SELECT_TASK,
+    "unselecttask": CallbackOperation.UNSELECT_TASK,
+    "selectnext": CallbackOperation.SELECT_NEXT,
+    "selectprev": CallbackOperation.SELECT_PREV,
+    "bulkcomplete": CallbackOperation.BULK_COMPLETE,
+    "bulkuncomplete": CallbackOperation.BULK_UNCOMPLETE,
+    "bulkdelete": CallbackOperation.BULK_DELETE,
+}
+
+PRIVATE_LIST_ID = 0
+
+
+@lru_cache(maxsize=8192)
+def encode_callback(operation: CallbackOperation, value: int = 0) -> str:
+    """
+    Encode callback data as a version byte, an operation byte and an unsigned
+    32-bit value in URL-safe base64, always CALLBACK_LENGTH characters.
+    """
+    return base64.urlsafe_b64encode(CALLBACK.pack(CALLBACK_VERSION, operation, value)).decode()
+
+
+@lru_cache(maxsize=8192)
+def decode_callback(data: Union[str, bytes, None]) -> Optional[Tuple[CallbackOperation, int]]:
+    """
+    Decode callback data into an operation and its value, or None if it is malformed.
+    Data in the old "operation_id" format of keyboards sent before is still understood.
+    Results are cached, since the same buttons are pressed and scanned repeatedly.
+    """
+    if isinstance(data, bytes):
+        try:
+            data = data.decode()
+        except UnicodeDecodeError:
+            return None
+    if not data:
+        return None
+    if len(data) == CALLBACK_LENGTH:
+        try:
+            version, operation, value = CALLBACK.unpack(base64.urlsafe_b64decode(data))
+        except (binascii.Error, struct.error, ValueError):
+            version = None
+        if version == CALLBACK_VERSION and operation in OPERATIONS:
+            return OPERATIONS[operation], value
+    name, _, value = data.partition("_")
+    operation = LEGACY_OPERATIONS.get(name)
+    if operation is None or not value.isdecimal():
+        return None
+    return operation, int(value)
+
+
+@lru_cache(maxsize=4096)
+def _button(text: str, operation: CallbackOperation, value: int = 0) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=text, callback_data=encode_callback(operation, value))
+
+
+def _completion_text(number: str, is_complete: bool) -> str:
+    return f"{number}. {'✅' if is_complete else '⬜'}"
+
+
+@lru_cache(maxsize=4096)
+def _task_action_row(number: int, task_id: int, is_complete: bool, is_own: bool) -> Tuple[InlineKeyboardButton, ...]:
+    return (
+        _button(f"{number}. update", CallbackOperation.UPDATE_TASK, task_id),
+        _button(_completion_text(str(number), is_complete), CallbackOperation.COMPLETE_TASK, task_id),
+        *([_button(f"{number}. ⏰", CallbackOperation.REMIND_TASK, task_id)] if is_own else []),
+        _button(f"{number}. delete", CallbackOperation.DELETE_TASK, task_id),
+    )
+
+
+BULK_ACTIONS_ROW = (
+    _button("complete", CallbackOperation.BULK_COMPLETE),
+    _button("uncomplete", CallbackOperation.BULK_UNCOMPLETE),
+    _button("delete", CallbackOperation.BULK_DELETE),
+    _button("share", CallbackOperation.BULK_SHARE),
+)
+
+BULK_ACTIONS = {decode_callback(button.callback_data) for button in BULK_ACTIONS_ROW}
+
+_REPLY_KEYBOARDS: Dict[Tuple[Tuple[str, ...], ...], ReplyKeyboardMarkup] = {}
+
+
+def reply_keyboard(buttons: Optional[List[List[KeyboardButton]]]) -> Optional[ReplyKeyboardMarkup]:
+    """
+    Get the reply keyboard for the given buttons, built once per distinct layout.
+    Keyboards are shared between replies, so they must not be modified.
+    """
+    if not buttons:
+        return None
+    key = tuple(tuple(button.text for button in row) for row in buttons)
+    markup = _REPLY_KEYBOARDS.get(key)
+    if markup is None:
+        markup = _REPLY_KEYBOARDS[key] = ReplyKeyboardMarkup(buttons, resize_keyboard=True)
+    return markup
+
+
+def task_action_rows(tasks: List["TaskCard"], start: int = 1) -> List[List[InlineKeyboardButton]]:
+    """
+    Build numbered update, complete, reminder and delete buttons for every task.
+    Reminders go to the task owner, so shared tasks of other members get no reminder button.
+    Buttons are cached and shared between keyboards, so they must not be modified.
+    """
+    return [
+        list(_task_action_row(number, task.id, bool(task.is_complete), task.is_own))
+        for number, task in enumerate(tasks, start=start)
+    ]
+
+
+def tasks_page_markup(tasks: List["TaskCard"], has_prev: bool, has_next: bool) -> InlineKeyboardMarkup:
+    """
+    Build inline keyboard for a page of tasks with per-task actions and page navigation.
+    """
+    inline_keyboard = task_action_rows(tasks)
+    navigation = []
+    if tasks and has_prev:
+        navigation.append(_button("« prev", CallbackOperation.PREV_PAGE, tasks[0].id))
+    if tasks and has_next:
+        navigation.append(_button("next »", CallbackOperation.NEXT_PAGE, tasks[-1].id))
+    if navigation:
+        inline_keyboard.append(navigation)
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
+def search_results_markup(tasks: List["TaskCard"], offset: int, limit: int, has_next: bool) -> InlineKeyboardMarkup:
+    """
+    Build inline keyboard for a page of search results.
+    """
+    inline_keyboard = task_action_rows(tasks, start=offset + 1)
+    navigation = []
+    if offset > 0:
+        navigation.append(_button("« prev", CallbackOperation.FIND_PAGE, max(offset - limit, 0)))
+    if has_next:
+        navigation.append(_button("next »", CallbackOperation.FIND_PAGE, offset + limit))
+    if navigation:
+        inline_keyboard.append(navigation)
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
+def mark_task_complete(markup: InlineKeyboardMarkup, task_id: int, is_complete: bool) -> InlineKeyboardMarkup:
+    """
+    Build a copy of a tasks page keyboard with the completion mark of a task updated.
+    """
+    def replace(button: InlineKeyboardButton) -> InlineKeyboardButton:
+        if decode_callback(button.callback_data) != (CallbackOperation.COMPLETE_TASK, task_id):
+            return button
+        number = button.text.split(".")[0]
+        return _button(_completion_text(number, is_complete), CallbackOperation.COMPLETE_TASK, task_id)
+
+    return InlineKeyboardMarkup(inline_keyboard=[[replace(button) for button in row] for row in markup.inline_keyboard])
+
+
+def select_tasks_markup(
+    tasks: List["TaskCard"], has_prev: bool, has_next: bool, selected: AbstractSet[int] = frozenset()
+) -> InlineKeyboardMarkup:
+    """
+    Build inline keyboard for choosing several tasks and applying a bulk action to them.
+    Tasks in `selected` are shown marked.
+    """
+    inline_keyboard = []
+    for task in tasks:
+        if task.id in selected:
+            inline_keyboard.append([_button(f"☑ {task.title[:40]}", CallbackOperation.UNSELECT_TASK, task.id)])
+        else:
+            inline_keyboard.append([_button(f"⬜ {task.title[:40]}", CallbackOperation.SELECT_TASK, task.id)])
+    navigation = []
+    if tasks and has_prev:
+        navigation.append(_button("« prev", CallbackOperation.SELECT_PREV, tasks[0].id))
+    if tasks and has_next:
+        navigation.append(_button("next »", CallbackOperation.SELECT_NEXT, tasks[-1].id))
+    if navigation:
+        inline_keyboard.append(navigation)
+    inline_keyboard.append(list(BULK_ACTIONS_ROW))
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
+def toggle_task_selection(markup: InlineKeyboardMarkup, task_id: int) -> InlineKeyboardMarkup:
+    """
+    Build a copy of a select keyboard with the selection mark of a task flipped.
+    """
+    def replace(button: InlineKeyboardButton) -> InlineKeyboardButton:
+        callback = decode_callback(button.callback_data)
+        if callback == (CallbackOperation.SELECT_TASK, task_id):
+            return _button("☑" + button.text[1:], CallbackOperation.UNSELECT_TASK, task_id)
+        if callback == (CallbackOperation.UNSELECT_TASK, task_id):
+            return _button("⬜" + button.text[1:], CallbackOperation.SELECT_TASK, task_id)
+        return button
+
+    return InlineKeyboardMarkup(inline_keyboard=[[replace(button) for button in row] for row in markup.inline_keyboard])
+
+
+def share_targets_markup(markup: InlineKeyboardMarkup, lists: List["Row"]) -> InlineKeyboardMarkup:
+    """
+    Build a copy of a select keyboard with the bulk actions replaced by the lists to share
+    the selected tasks with, keeping the selection in place.
+    """
+    inline_keyboard = [
+        list(row) for row in markup.inline_keyboard
+        if not any(decode_callback(button.callback_data) in BULK_ACTIONS for button in row)
+    ]
+    inline_keyboard.extend(
+        [_button(f"📋 {task_list.name[:40]}", CallbackOperation.SHARE_TO_LIST, task_list.id)] for task_list in lists
+    )
+    inline_keyboard.append([_button("🔒 private", CallbackOperation.SHARE_TO_LIST, PRIVATE_LIST_ID)])
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
+def page_task_ids(markup: InlineKeyboardMarkup) -> List[int]:
+    """
+    Get IDs of all tasks shown in a select keyboard, marked or not.
+    """
+    task_ids = []
+    for row in markup.inline_keyboard:
+        for button in row:
+            callback = decode_callback(button.callback_data)
+            if callback is not None and callback[0] in (CallbackOperation.SELECT_TASK, CallbackOperation.UNSELECT_TASK):
+                task_ids.append(callback[1])
+    return task_ids
+
+
+def selected_task_ids(markup: InlineKeyboardMarkup) -> List[int]:
+    """
+    Get IDs of tasks marked in a select keyboard.
+    """
+    task_ids = []
+    for row in markup.inline_keyboard:
+        for button in row:
+            callback = decode_callback(button.callback_data)
+            if callback is not None and callback[0] == CallbackOperation.UNSELECT_TASK:
+                task_ids.append(callback[1])
+    return task_ids
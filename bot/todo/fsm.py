@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from pyrogram.types import KeyboardButton
+from sqlalchemy.engine import Row
+
+from database.models import User, Task, StatesUserEnum
+from database.repository import Repository
+from database.state import FSMState, state_store
+
+
+class Transition:
+    """
+    One input handled by the state machine: the user, their state and the changes collected on the way.
+
+    Input handlers record what has to be persisted here instead of writing it themselves,
+    so the whole transition is saved in one unit of work and one state store write.
+    """
+
+    __slots__ = (
+        "user", "state", "text", "source", "message", "buttons",
+        "task", "task_changes", "updated_task",
+    )
+
+    def __init__(self, user: User, state: FSMState, text: Optional[str]) -> None:
+        self.user = user
+        self.state = state
+        self.text = text
+        self.source: StatesUserEnum = state.status
+        self.message: str = ""
+        self.buttons: Optional[List[List[KeyboardButton]]] = None
+        self.task: Optional[Task] = None
+        self.task_changes: dict = {}
+        self.updated_task: Optional[Row] = None
+
+
+InputHandler = Callable[[Transition], Awaitable[Optional[str]]]
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Transition table entry of one state.
+
+    `accept` records the input into the transition and returns an error message to stay
+    in the state, or None to move to `target` and reply with `reply`. States without
+    `accept` move on any input. `on_commit` runs once the transition is saved.
+    """
+    target: StatesUserEnum
+    reply: Union[str, Callable[[Transition], str]]
+    accept: Optional[InputHandler] = None
+    buttons: Optional[List[List[KeyboardButton]]] = None
+    on_commit: Optional[Callable[[Transition], None]] = None
+
+
+class StateMachine:
+    """
+    Table-driven FSM engine.
+
+    Rules are looked up by indexing a tuple with the status, so dispatch does not depend
+    on the number of flows; a new flow is a new set of rules, not a new branch. Statuses
+    without a rule, such as FINISH, ignore input.
+    """
+
+    def __init__(self, rules: Dict[StatesUserEnum, Rule]) -> None:
+        self._rules: Tuple[Optional[Rule], ...] = tuple(rules.get(status) for status in range(max(rules) + 1))
+
+    def __contains__(self, status: int) -> bool:
+        return 0 <= status < len(self._rules) and self._rules[status] is not None
+
+    async def run(self, user: User, state: FSMState, text: Optional[str] = None) -> Optional[Transition]:
+        """
+        Handle an input in the current state and persist the result.
+        A flow is started by passing a fresh state with its start status and no text.
+        If the changes cannot be saved, for example because the task was deleted meanwhile,
+        the flow ends and the reply says so. Returns None if the status has no rule.
+        """
+        if state.status not in self:
+            return None
+        rule = self._rules[state.status]
+        transition = Transition(user, state, text)
+        if rule.accept is not None:
+            error = await rule.accept(transition)
+            if error is not None:
+                transition.message = error
+                return transition
+        state.status = rule.target
+        transition.message = rule.reply if isinstance(rule.reply, str) else rule.reply(transition)
+        transition.buttons = rule.buttons
+        if not await self._persist(transition):
+            state.status = StatesUserEnum.FINISH
+            await state_store.delete(user.tg_id)
+            transition.message = "Не удалось сохранить изменения, начните заново"
+            transition.buttons = None
+            return transition
+        if rule.on_commit is not None:
+            rule.on_commit(transition)
+        return transition
+
+    async def _persist(self, transition: Transition) -> bool:
+        """
+        Save durable changes in one transaction and the FSM state to the state store.
+        """
+        if transition.task is not None or transition.task_changes:
+            try:
+                async with Repository.unit_of_work() as uow:
+                    if transition.task is not None:
+                        await uow.insert_task(transition.task)
+                    elif transition.task_changes:
+                        transition.updated_task = await uow.update_task(
+                            transition.user, transition.state.task_id, **transition.task_changes
+                        )
+            except Exception:
+                return False
+        if transition.state.status == StatesUserEnum.FINISH:
+            await state_store.delete(transition.user.tg_id)
+        else:
+            await state_store.set(transition.user.tg_id, transition.state)
+        return True
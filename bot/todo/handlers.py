@@ -1,29 +1,50 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+from html import escape
+from typing import FrozenSet, List, Optional
+
 from pyrogram import filters, Client
 from pyrogram.types import (
-    InlineKeyboardButton,
     Message,
-    ReplyKeyboardMarkup,
-    InlineKeyboardMarkup,
     CallbackQuery,
 )
 
-from database.models import Task, User, StatesUserEnum
+from database.cache import task_selections
+from database.models import TaskCard, User, StatesUserEnum
 from database.repository import Repository
+from database.state import FSMState
 from main.client import app
 from main.middleware import get_user
-from todo.buttons import REPLY_KEYBOARD
-from todo.implementation import RegistrationUser, CreateTask, UpdateTask
+from main.reminders import reminder_scheduler
+from main.variables import TASKS_PAGE_SIZE, TRANSFER_BATCH_SIZE, IMPORT_MAX_SIZE
+from todo.buttons import (
+    REPLY_KEYBOARD,
+    CallbackOperation,
+    decode_callback,
+    reply_keyboard,
+    tasks_page_markup,
+    search_results_markup,
+    mark_task_complete,
+    select_tasks_markup,
+    toggle_task_selection,
+    page_task_ids,
+    selected_task_ids,
+    share_targets_markup,
+)
+from todo.implementation import load_state, state_machine
+from todo.transfer import EXPORT_FORMATS, TaskFileError, read_tasks, write_tasks
 
 
 @app.on_message(filters.command("start") & filters.private)
-async def start_wrapper(_, message: Message) -> None:
+async def start_wrapper(client: Client, message: Message) -> None:
     """
     Handle /start command.
     """
     user = await Repository.get_user(tg_id=message.from_user.id)
     if not user:
         await Repository.create_user(tg_id=message.from_user.id)
-        await message.reply_text("Hello", reply_markup=REPLY_KEYBOARD)
+        client.sender.send_message(message.chat.id, "Hello", reply_markup=REPLY_KEYBOARD)
 
 
 @app.on_message(filters.command("registration") & filters.private)
@@ -32,9 +53,8 @@ async def start_registration(client: Client, message: Message, user: User) -> No
     """
     Handle /registration command.
     """
-    text, buttons = await RegistrationUser(user).start_action()
-    reply_markup = ReplyKeyboardMarkup(buttons, resize_keyboard=True) if buttons else None
-    await message.reply_text(text, reply_markup=reply_markup)
+    transition = await state_machine.run(user, FSMState(StatesUserEnum.START))
+    client.sender.send_message(message.chat.id, transition.message, reply_markup=reply_keyboard(transition.buttons))
 
 
 @app.on_message(filters.command("create") & filters.private)
@@ -43,9 +63,22 @@ async def start_create(client: Client, message: Message, user: User) -> None:
     """
     Handle /create command.
     """
-    text, buttons = await CreateTask(user).start_action()
-    reply_markup = ReplyKeyboardMarkup(buttons, resize_keyboard=True) if buttons else None
-    await message.reply_text(text, reply_markup=reply_markup)
+    transition = await state_machine.run(user, FSMState(StatesUserEnum.CREATE_TASK_START))
+    client.sender.send_message(message.chat.id, transition.message, reply_markup=reply_keyboard(transition.buttons))
+
+
+def render_tasks_page(tasks: List[TaskCard], start: int = 1) -> str:
+    """
+    Render a page of tasks as a single message text.
+    """
+    if not tasks:
+        return "<b>You have no tasks</b>"
+    return "\n\n".join(
+        f"<b>{number}. {escape(task.title)}</b>\n"
+        f"Description: <i>{escape(task.description or '')}</i>"
+        + (f"\nDue: {task.due_at.astimezone(timezone.utc):%Y-%m-%d %H:%M} UTC" if task.due_at else "")
+        for number, task in enumerate(tasks, start=start)
+    )
 
 
 @app.on_message(filters.command("show") & filters.private)
@@ -54,46 +87,67 @@ async def show_tasks(client: Client, message: Message, user: User) -> None:
     """
     Handle /show command.
     """
-    tasks = await Repository.get_tasks(user=user, params={"is_visible": True})
-    for [task] in tasks:
-        text = f"<b>{task.title}</b>\n" \
-               f"Description: <i>{task.description}</i>\n" \
-               f"Status: <code>{'complite' if task.is_complete else 'not complited'}</code>"
-        await message.reply_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text="update",
-                            callback_data=f"updatetask_{task.id}"
-                        ),
-                        InlineKeyboardButton(
-                            text="uncomplite task" if task.is_complete else "complite task",
-                            callback_data=f"completetask_{task.id}"
-                        ),
-                        InlineKeyboardButton(
-                            text="delete task",
-                            callback_data=f"deletetask_{task.id}"
-                        )
-                    ]
-                ]
-            )
-        )
+    tasks, has_prev, has_next = await Repository.get_tasks_page(user, limit=TASKS_PAGE_SIZE)
+    client.sender.send_message(
+        message.chat.id,
+        render_tasks_page(tasks),
+        reply_markup=tasks_page_markup(tasks, has_prev, has_next) if tasks else None
+    )
 
 
 @get_user
-async def change_status_task(client: Client, call: CallbackQuery, task_id: int, user: User) -> None:
+async def show_tasks_page(
+    client: Client, call: CallbackQuery, user: User, after_id: int = None, before_id: int = None
+) -> None:
     """
-    Change task status based on callback query.
+    Show the next or previous page of tasks by editing the message in place.
     """
-    task: Task = await Repository.get_task(user, task_id)
-    task.is_complete = not task.is_complete
-    await Repository.save(task)
-    await call.message.reply_text(
-        f"<b>Task {task.title} status:</b> {'<i>completed</i>' if task.is_complete else '<i>not completed</i>'}"
+    tasks, has_prev, has_next = await Repository.get_tasks_page(
+        user, after_id=after_id, before_id=before_id, limit=TASKS_PAGE_SIZE
     )
+    if not tasks:
+        tasks, has_prev, has_next = await Repository.get_tasks_page(user, limit=TASKS_PAGE_SIZE)
+    client.sender.answer_callback_query(call)
+    client.sender.edit_message_text(
+        call.message.chat.id,
+        call.message.id,
+        render_tasks_page(tasks),
+        reply_markup=tasks_page_markup(tasks, has_prev, has_next) if tasks else None
+    )
+
 
+async def notify_list_members(client: Client, user: User, list_id: Optional[int], text: str) -> None:
+    """
+    Tell the other members of a shared list about a change of one of its tasks.
+    Member chats are resolved in one query and the messages are broadcast through
+    the send queue, so the handler does not wait for them to be sent.
+    """
+    if list_id is None:
+        return
+    chat_ids = await Repository.get_list_member_chats(list_id, exclude_user_id=user.id)
+    client.sender.broadcast(chat_ids, f"📋 {escape(user.name or user.login or 'Someone')} {text}")
+
+
+@get_user
+async def change_status_task(client: Client, call: CallbackQuery, task_id: int, user: User) -> None:
+    """
+    Toggle task status and update its button in place.
+    """
+    task = await Repository.toggle_task(user, task_id)
+    if task is None:
+        client.sender.answer_callback_query(call, "Task not found")
+        return
+    client.sender.answer_callback_query(
+        call, f"Task {task.title}: {'completed' if task.is_complete else 'not completed'}"
+    )
+    client.sender.edit_message_reply_markup(
+        call.message.chat.id,
+        call.message.id,
+        mark_task_complete(call.message.reply_markup, task_id, task.is_complete)
+    )
+    await notify_list_members(
+        client, user, task.list_id, f"{'completed' if task.is_complete else 'reopened'} <b>{escape(task.title)}</b>"
+    )
 
 
 @get_user
@@ -101,8 +155,10 @@ async def delete_task(client: Client, call: CallbackQuery, task_id: int, user: U
     """
     Delete task based on callback query.
     """
-    await Repository.delete_task(user, task_id)
-    await call.message.reply_text(f"<b>Task was deleted</b>")
+    task = await Repository.delete_task(user, task_id)
+    client.sender.send_message(call.message.chat.id, f"<b>Task was deleted</b>")
+    if task is not None:
+        await notify_list_members(client, user, task.list_id, f"deleted <b>{escape(task.title)}</b>")
 
 
 @get_user
@@ -110,10 +166,329 @@ async def start_update_task(client: Client, call: CallbackQuery, task_id: int, u
     """
     Start updating a task based on callback query.
     """
-    user.task_id = task_id
-    text, buttons = await UpdateTask(user).start_action()
-    reply_markup = ReplyKeyboardMarkup(buttons, resize_keyboard=True) if buttons else None
-    await call.message.reply_text(text, reply_markup=reply_markup)
+    state = FSMState(StatesUserEnum.UPDATE_TASK_START, task_id=task_id)
+    transition = await state_machine.run(user, state)
+    client.sender.send_message(call.message.chat.id, transition.message, reply_markup=reply_keyboard(transition.buttons))
+
+
+@get_user
+async def start_remind_task(client: Client, call: CallbackQuery, task_id: int, user: User) -> None:
+    """
+    Start setting a due date and reminder of a task based on callback query.
+    """
+    state = FSMState(StatesUserEnum.REMIND_TASK_START, task_id=task_id)
+    transition = await state_machine.run(user, state)
+    client.sender.answer_callback_query(call)
+    client.sender.send_message(call.message.chat.id, transition.message)
+
+
+SEARCH_HEADER = "🔎 "
+
+
+def render_search_results(query: str, tasks: List[TaskCard], offset: int) -> str:
+    """
+    Render a page of search results. The first line keeps the query for paging.
+    """
+    header = f"{SEARCH_HEADER}{escape(query)}"
+    if not tasks:
+        return f"{header}\n\n<b>Nothing found</b>"
+    return f"{header}\n\n{render_tasks_page(tasks, start=offset + 1)}"
+
+
+@app.on_message(filters.command("find") & filters.private)
+@get_user
+async def find_tasks(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /find command.
+    """
+    parts = message.text.split(maxsplit=1)
+    query = parts[1].strip() if len(parts) > 1 else ""
+    if not query:
+        client.sender.send_message(message.chat.id, "Usage: /find <text>")
+        return
+    tasks, has_next = await Repository.search_tasks(user, query, limit=TASKS_PAGE_SIZE)
+    client.sender.send_message(
+        message.chat.id,
+        render_search_results(query, tasks, 0),
+        reply_markup=search_results_markup(tasks, 0, TASKS_PAGE_SIZE, has_next) if tasks else None
+    )
+
+
+@get_user
+async def find_tasks_page(client: Client, call: CallbackQuery, offset: int, user: User) -> None:
+    """
+    Show another page of search results by editing the message in place.
+    """
+    query = call.message.text.split("\n", 1)[0][len(SEARCH_HEADER):]
+    tasks, has_next = await Repository.search_tasks(user, query, limit=TASKS_PAGE_SIZE, offset=offset)
+    client.sender.answer_callback_query(call)
+    client.sender.edit_message_text(
+        call.message.chat.id,
+        call.message.id,
+        render_search_results(query, tasks, offset),
+        reply_markup=search_results_markup(tasks, offset, TASKS_PAGE_SIZE, has_next) if tasks else None
+    )
+
+
+@app.on_message(filters.command("complete_all") & filters.private)
+@get_user
+async def complete_all_tasks(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /complete_all command.
+    """
+    completed = await Repository.set_tasks_complete(user, True)
+    client.sender.send_message(message.chat.id, f"<b>Completed tasks:</b> {len(completed)}")
+
+
+@app.on_message(filters.command("delete_completed") & filters.private)
+@get_user
+async def delete_completed_tasks(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /delete_completed command.
+    """
+    deleted = await Repository.delete_tasks(user, is_complete=True)
+    client.sender.send_message(message.chat.id, f"<b>Deleted tasks:</b> {deleted}")
+
+
+@app.on_message(filters.command("export") & filters.private)
+@get_user
+async def export_tasks(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /export command. Streams all tasks into a JSON lines or CSV file sent as one document.
+    """
+    parts = message.text.split()
+    file_format = parts[1].lower() if len(parts) > 1 else EXPORT_FORMATS[0]
+    if file_format not in EXPORT_FORMATS:
+        client.sender.send_message(message.chat.id, f"Usage: /export [{'|'.join(EXPORT_FORMATS)}]")
+        return
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="", prefix="tasks-", suffix=f".{file_format}", delete=False
+    ) as file:
+        try:
+            rows = Repository.iter_export_rows(user, batch_size=TRANSFER_BATCH_SIZE)
+            count = await write_tasks(file, rows, file_format)
+        except Exception:
+            os.unlink(file.name)
+            raise
+    if not count:
+        os.unlink(file.name)
+        client.sender.send_message(message.chat.id, "<b>You have no tasks</b>")
+        return
+    sent = client.sender.send_document(
+        message.chat.id, file.name, file_name=f"tasks.{file_format}", caption=f"<b>Exported tasks:</b> {count}"
+    )
+    sent.add_done_callback(lambda _: os.unlink(file.name))
+
+
+@app.on_message(filters.command("import") & filters.private)
+@get_user
+async def import_tasks(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /import command sent as the caption of a file or in reply to one.
+    Tasks are added in batches in one transaction, so a broken file imports nothing.
+    """
+    document = message.document or (message.reply_to_message.document if message.reply_to_message else None)
+    if document is None:
+        client.sender.send_message(message.chat.id, "Send a file made by /export with the caption /import")
+        return
+    file_format = os.path.splitext(document.file_name or "")[1].lstrip(".").lower()
+    if file_format not in EXPORT_FORMATS:
+        client.sender.send_message(message.chat.id, f"Only {', '.join(EXPORT_FORMATS)} files can be imported")
+        return
+    if document.file_size and document.file_size > IMPORT_MAX_SIZE:
+        client.sender.send_message(message.chat.id, f"The file is larger than {IMPORT_MAX_SIZE // 1024} KB")
+        return
+    path = os.path.join(tempfile.gettempdir(), f"import-{message.chat.id}-{message.id}.{file_format}")
+    try:
+        await client.download_media(document.file_id, file_name=path)
+        with open(path, encoding="utf-8", newline="") as file:
+            records = read_tasks(file, file_format, datetime.now(timezone.utc))
+            count = await Repository.import_tasks(user, records, batch_size=TRANSFER_BATCH_SIZE)
+    except TaskFileError as e:
+        client.sender.send_message(message.chat.id, f"<b>Nothing imported</b>, {escape(str(e))}")
+        return
+    except UnicodeDecodeError:
+        client.sender.send_message(message.chat.id, "<b>Nothing imported</b>, the file is not UTF-8 text")
+        return
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+    reminder_scheduler.reload()
+    client.sender.send_message(message.chat.id, f"<b>Imported tasks:</b> {count}")
+
+
+@app.on_message(filters.command("select") & filters.private)
+@get_user
+async def select_tasks(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /select command.
+    """
+    tasks, has_prev, has_next = await Repository.get_tasks_page(user, limit=TASKS_PAGE_SIZE, shared=False)
+    if not tasks:
+        client.sender.send_message(message.chat.id, "<b>You have no tasks</b>")
+        return
+    client.sender.send_message(
+        message.chat.id,
+        "<b>Select your tasks</b>",
+        reply_markup=select_tasks_markup(tasks, has_prev, has_next)
+    )
+
+
+def current_selection(message: Message) -> FrozenSet[int]:
+    """
+    Get IDs of the tasks selected in a select keyboard, on its current page and on the pages shown before.
+    """
+    selection = task_selections.get((message.chat.id, message.id)) or frozenset()
+    return selection.difference(page_task_ids(message.reply_markup)).union(selected_task_ids(message.reply_markup))
+
+
+@get_user
+async def select_tasks_page(
+    client: Client, call: CallbackQuery, user: User, after_id: int = None, before_id: int = None
+) -> None:
+    """
+    Show the next or previous page of the select keyboard, keeping the tasks selected so far.
+    """
+    selection = current_selection(call.message)
+    task_selections.set((call.message.chat.id, call.message.id), selection)
+    tasks, has_prev, has_next = await Repository.get_tasks_page(
+        user, after_id=after_id, before_id=before_id, limit=TASKS_PAGE_SIZE, shared=False
+    )
+    if not tasks:
+        tasks, has_prev, has_next = await Repository.get_tasks_page(user, limit=TASKS_PAGE_SIZE, shared=False)
+    client.sender.answer_callback_query(call, f"Selected: {len(selection)}" if selection else None)
+    client.sender.edit_message_reply_markup(
+        call.message.chat.id, call.message.id, select_tasks_markup(tasks, has_prev, has_next, selection)
+    )
+
+
+async def select_task(client: Client, call: CallbackQuery, task_id: int) -> None:
+    """
+    Mark or unmark a task in the select keyboard without touching the database.
+    """
+    client.sender.answer_callback_query(call)
+    client.sender.edit_message_reply_markup(
+        call.message.chat.id, call.message.id, toggle_task_selection(call.message.reply_markup, task_id)
+    )
+
+
+@get_user
+async def apply_to_selected_tasks(
+    client: Client, call: CallbackQuery, operation: CallbackOperation, user: User
+) -> None:
+    """
+    Complete, uncomplete or delete all selected tasks with a single query.
+    """
+    task_ids = list(current_selection(call.message))
+    if not task_ids:
+        client.sender.answer_callback_query(call, "Select tasks first")
+        return
+    if operation == CallbackOperation.BULK_DELETE:
+        text = f"<b>Deleted tasks:</b> {await Repository.delete_tasks(user, task_ids)}"
+    elif operation == CallbackOperation.BULK_COMPLETE:
+        text = f"<b>Completed tasks:</b> {len(await Repository.set_tasks_complete(user, True, task_ids))}"
+    else:
+        text = f"<b>Uncompleted tasks:</b> {len(await Repository.set_tasks_complete(user, False, task_ids))}"
+    task_selections.invalidate((call.message.chat.id, call.message.id))
+    client.sender.answer_callback_query(call)
+    client.sender.edit_message_text(call.message.chat.id, call.message.id, text)
+
+
+@get_user
+async def show_share_targets(client: Client, call: CallbackQuery, user: User) -> None:
+    """
+    Offer the user's lists to share the selected tasks with.
+    """
+    if not current_selection(call.message):
+        client.sender.answer_callback_query(call, "Select tasks first")
+        return
+    lists = await Repository.get_lists(user)
+    client.sender.answer_callback_query(call, None if lists else "Create a list with /newlist to share tasks")
+    client.sender.edit_message_reply_markup(
+        call.message.chat.id, call.message.id, share_targets_markup(call.message.reply_markup, lists)
+    )
+
+
+@get_user
+async def share_selected_tasks(client: Client, call: CallbackQuery, list_id: int, user: User) -> None:
+    """
+    Move the selected tasks of the user into a shared list, or make them private again.
+    """
+    task_ids = list(current_selection(call.message))
+    if not task_ids:
+        client.sender.answer_callback_query(call, "Select tasks first")
+        return
+    moved = await Repository.share_tasks(user, task_ids, list_id or None)
+    task_selections.invalidate((call.message.chat.id, call.message.id))
+    client.sender.answer_callback_query(call)
+    text = f"<b>Shared tasks:</b> {len(moved)}" if list_id else f"<b>Private tasks:</b> {len(moved)}"
+    client.sender.edit_message_text(call.message.chat.id, call.message.id, text)
+    if list_id and moved:
+        await notify_list_members(client, user, list_id, f"shared tasks with the list: {len(moved)}")
+
+
+@app.on_message(filters.command("newlist") & filters.private)
+@get_user
+async def create_list(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /newlist command.
+    """
+    parts = message.text.split(maxsplit=1)
+    name = parts[1].strip()[:100] if len(parts) > 1 else ""
+    if not name:
+        client.sender.send_message(message.chat.id, "Usage: /newlist <name>")
+        return
+    task_list = await Repository.create_list(user, name)
+    client.sender.send_message(
+        message.chat.id,
+        f"<b>List {escape(task_list.name)} created</b>\n"
+        f"Members join with /join {task_list.invite_code}\n"
+        f"Share tasks with it from /select"
+    )
+
+
+@app.on_message(filters.command("join") & filters.private)
+@get_user
+async def join_list(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /join command.
+    """
+    parts = message.text.split()
+    task_list = await Repository.join_list(user, parts[1]) if len(parts) > 1 else None
+    if task_list is None:
+        client.sender.send_message(message.chat.id, "Usage: /join <invite code>")
+        return
+    client.sender.send_message(message.chat.id, f"<b>You joined the list {escape(task_list.name)}</b>")
+    await notify_list_members(client, user, task_list.id, "joined the list")
+
+
+@app.on_message(filters.command("leave") & filters.private)
+@get_user
+async def leave_list(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /leave command.
+    """
+    parts = message.text.split()
+    if len(parts) < 2 or not await Repository.leave_list(user, parts[1]):
+        client.sender.send_message(message.chat.id, "Usage: /leave <invite code> of a list you are a member of")
+        return
+    client.sender.send_message(message.chat.id, "<b>You left the list</b>")
+
+
+@app.on_message(filters.command("lists") & filters.private)
+@get_user
+async def show_lists(client: Client, message: Message, user: User) -> None:
+    """
+    Handle /lists command.
+    """
+    lists = await Repository.get_lists(user)
+    if not lists:
+        client.sender.send_message(message.chat.id, "<b>You are not a member of any list</b>\nCreate one with /newlist")
+        return
+    client.sender.send_message(message.chat.id, "\n".join(
+        f"📋 <b>{escape(task_list.name)}</b>, members: {task_list.members}, invite: /join {task_list.invite_code}"
+        for task_list in lists
+    ))
 
 
 @app.on_callback_query()
@@ -121,14 +496,37 @@ async def command_query(client: Client, call: CallbackQuery) -> None:
     """
     Handle callback queries.
     """
-    operation, id = call.data.split('_')
-    id = int(id)
-    if operation == "updatetask":
-        await start_update_task(client, call, task_id=id)
-    elif operation == "completetask":
-        await change_status_task(client, call, task_id=id)
-    elif operation == "deletetask":
-        await delete_task(client, call, task_id=id)
+    callback = decode_callback(call.data)
+    if callback is None:
+        client.sender.answer_callback_query(call, "This button is no longer supported")
+        return
+    operation, value = callback
+    if operation == CallbackOperation.UPDATE_TASK:
+        await start_update_task(client, call, task_id=value)
+    elif operation == CallbackOperation.COMPLETE_TASK:
+        await change_status_task(client, call, task_id=value)
+    elif operation == CallbackOperation.REMIND_TASK:
+        await start_remind_task(client, call, task_id=value)
+    elif operation == CallbackOperation.DELETE_TASK:
+        await delete_task(client, call, task_id=value)
+    elif operation == CallbackOperation.NEXT_PAGE:
+        await show_tasks_page(client, call, after_id=value)
+    elif operation == CallbackOperation.PREV_PAGE:
+        await show_tasks_page(client, call, before_id=value)
+    elif operation == CallbackOperation.FIND_PAGE:
+        await find_tasks_page(client, call, offset=value)
+    elif operation in (CallbackOperation.SELECT_TASK, CallbackOperation.UNSELECT_TASK):
+        await select_task(client, call, task_id=value)
+    elif operation == CallbackOperation.SELECT_NEXT:
+        await select_tasks_page(client, call, after_id=value)
+    elif operation == CallbackOperation.SELECT_PREV:
+        await select_tasks_page(client, call, before_id=value)
+    elif operation == CallbackOperation.BULK_SHARE:
+        await show_share_targets(client, call)
+    elif operation == CallbackOperation.SHARE_TO_LIST:
+        await share_selected_tasks(client, call, list_id=value)
+    else:
+        await apply_to_selected_tasks(client, call, operation=operation)
 
 
 @app.on_message(filters.text & filters.private)
@@ -137,13 +535,10 @@ async def make_action(client: Client, message: Message, user: User) -> None:
     """
     Perform an action based on user input.
     """
-    if user.status == StatesUserEnum.FINISH:
+    transition = await state_machine.run(user, await load_state(user), message.text)
+    if transition is None:
         return
-    elif user.status < 10:
-        text, buttons = await RegistrationUser(user).continue_action(message.text)
-    elif user.status < 20:
-        text, buttons = await CreateTask(user).continue_action(message.text)
-    elif user.status < 30:
-        text, buttons = await UpdateTask(user).continue_action(message.text)
-    reply_markup = ReplyKeyboardMarkup(buttons, resize_keyboard=True) if buttons else None
-    await message.reply_text(text, reply_markup=reply_markup)
+    if transition.updated_task is not None and transition.source == StatesUserEnum.UPDATE_TASK_DESCRIPTION:
+        task = transition.updated_task
+        await notify_list_members(client, user, task.list_id, f"updated <b>{escape(task.title)}</b>")
+    client.sender.send_message(message.chat.id, transition.message, reply_markup=reply_keyboard(transition.buttons))
@@ -1,192 +1,170 @@
-from typing import Optional, List, Tuple
-
-from pyrogram.types import KeyboardButton
-from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timezone
+from typing import Optional
 
 from database.models import User, Task, StatesUserEnum
 from database.repository import Repository
+from database.state import FSMState, state_store
+from main.reminders import reminder_scheduler
 from todo.buttons import BUTTONS_AFTER_REGISTRATION
-from todo.validators import is_valid_name, is_valid_login
-
-
-class BaseAction:
-    """Base class for user actions."""
-
-    async_session = Repository.async_session
-
-    def __init__(self, user: User) -> None:
-        self._user: User = user
-        self._text: Optional[str] = None
-        self._required_save: bool = False
-        self._message: str = ""
-        self._buttons: Optional[List[List[KeyboardButton]]] = None
-
-    async def start_action(self) -> Tuple[str, Optional[List[List[KeyboardButton]]]]:
-        """Method to be called when starting the user action."""
-        raise NotImplementedError("Subclasses must implement start_action.")
-
-    async def continue_action(self, text: str) -> Tuple[str, Optional[List[List[KeyboardButton]]]]:
-        """Method to be called when continuing the user action."""
-        raise NotImplementedError("Subclasses must implement continue_action.")
-
-    async def _fsm_strategy(self) -> Tuple[str, Optional[List[List[KeyboardButton]]]]:
-        """Finite State Machine (FSM) strategy to handle different user states."""
-        raise NotImplementedError("Subclasses must implement _fsm_strategy.")
-
-    async def _save_models(self) -> bool:
-        """Save user and related models to the database."""
-        raise NotImplementedError("Subclasses must implement _save_models.")
-
-
-class RegistrationUser(BaseAction):
-
-    async def start_action(self) -> Tuple[str, Optional[List[List[KeyboardButton]]]]:
-        if self._user.status < StatesUserEnum.FINISH:
-            self._user.status = StatesUserEnum.START
-        return await self._fsm_strategy()
-
-    async def continue_action(self, text) -> Tuple[str, Optional[List[List[KeyboardButton]]]]:
-        self._text = text
-        return await self._fsm_strategy()
-
-    async def _fsm_strategy(self) -> Tuple[str, Optional[List[List[KeyboardButton]]]]:
-        if self._user.status == StatesUserEnum.START:
-            self._user.status = StatesUserEnum.ENTER_NAME
-            self._message = "Введите имя пользователся"
-            self._required_save = True
-        elif self._user.status == StatesUserEnum.ENTER_NAME:
-            if is_valid_name(self._text):
-                self._user.name = self._text
-                self._user.status = StatesUserEnum.ENTER_LOGIN
-                self._message = "Введите имя логин"
-                self._required_save = True
-            else:
-                self._message = "Введенное имя не подходит"
-        elif self._user.status == StatesUserEnum.ENTER_LOGIN:
-            if await is_valid_login(self._text):
-                self._user.login = self._text
-                self._user.status = StatesUserEnum.FINISH
-                self._message = "Поздравляю вы зарегистрировались"
-                self._buttons = BUTTONS_AFTER_REGISTRATION
-                self._required_save = True
-            else:
-                self._message = "Введенный логин не подходит"
-        else:
-            self._message = "Вы уже зарегистрированы"
-        if self._required_save and not await self._save_models():
-            raise Exception("Ошибка при сохранение")
-        return self._message, self._buttons
-
-    async def _save_models(self):
-        async with self.async_session() as session:
-            session.add(self._user)
-            try:
-                await session.flush()
-                await session.commit()
-                await session.refresh(self._user)
-                return True
-            except IntegrityError:
-                return False
-            except Exception:
-                return False
-
-
-class CreateTask(BaseAction):
-    async def start_action(self):
-        await Repository.delete_not_visible_task(self._user)
-        self._user.status = StatesUserEnum.CREATE_TASK_START
-        return await self._fsm_strategy()
-
-    async def continue_action(self, text):
-        self._text = text
-        return await self._fsm_strategy()
-
-    async def _fsm_strategy(self):
-        if self._user.status == StatesUserEnum.CREATE_TASK_START:
-            self._user.status = StatesUserEnum.CREATE_TASK_TITLE
-            self._message = "Введите название задачи"
-            self._required_save = True
-        elif self._user.status == StatesUserEnum.CREATE_TASK_TITLE:
-            self._task = Task(
-                user_id=self._user.id,
-                title=self._text
-            )
-            self._message = "Введите описание задачи"
-            self._user.status = StatesUserEnum.CREATE_TASK_DESCRIPTION
-            self._required_save = True
-        elif self._user.status == StatesUserEnum.CREATE_TASK_DESCRIPTION:
-            self._task: Task = await Repository.get_task(self._user)
-            self._task.description = self._text
-            self._task.is_visible = True
-            self._user.status = StatesUserEnum.FINISH
-            self._message = "Задача была создана"
-            self._required_save = True
-        if self._required_save and not await self._save_models():
-            raise Exception("Ошибка при сохранение")
-        return self._message, self._buttons
-
-    async def _save_models(self):
-        async with self.async_session() as session:
-            try:
-                if hasattr(self, '_task'):
-                    session.add(self._task)
-                    await session.commit()
-                    await session.refresh(self._task)
-                    self._user.task_id = self._task.id
-                session.add(self._user)
-                await session.commit()
-                await session.refresh(self._user)
-                return True
-            except IntegrityError:
-                return False
-            except Exception:
-                return False
-
-
-class UpdateTask(BaseAction):
-
-    async def start_action(self):
-        self._user.status = StatesUserEnum.UPDATE_TASK_START
-        return await self._fsm_strategy()
-
-    async def continue_action(self, text):
-        self._text = text
-        return await self._fsm_strategy()
-
-    async def _fsm_strategy(self):
-        self._required_save = True
-        if self._user.status == StatesUserEnum.UPDATE_TASK_START:
-            self._user.status = StatesUserEnum.UPDATE_TASK_TITLE
-            self._message = "Введите новое название задачи"
-            self._required_save = True
-        elif self._user.status == StatesUserEnum.UPDATE_TASK_TITLE:
-            self._task = await Repository.get_task(self._user)
-            self._task.title = self._text
-            self._message = "Введите новое описание задачи"
-            self._user.status = StatesUserEnum.UPDATE_TASK_DESCRIPTION
-            self._required_save = True
-        elif self._user.status == StatesUserEnum.UPDATE_TASK_DESCRIPTION:
-            self._task: Task = await Repository.get_task(self._user)
-            self._task.description = self._text
-            self._user.status = StatesUserEnum.FINISH
-            self._message = "Задача была обновлена"
-            self._required_save = True
-        if self._required_save and not await self._save_models():
-            raise Exception("Ошибка при сохранение")
-        return self._message, self._buttons
-
-    async def _save_models(self):
-        async with self.async_session() as session:
-            try:
-                if hasattr(self, '_task'):
-                    session.add(self._task)
-                    await session.commit()
-                    await session.refresh(self._task)
-                session.add(self._user)
-                await session.commit()
-                await session.refresh(self._user)
-                return True
-            except IntegrityError:
-                return False
-            except Exception:
-                return False
+from todo.fsm import Rule, StateMachine, Transition
+from todo.validators import is_valid_name, is_valid_login, parse_datetime
+
+
+async def load_state(user: User) -> FSMState:
+    """
+    Get the FSM state of a user from the state store, falling back to the registration status in the database.
+    """
+    state = await state_store.get(user.tg_id)
+    if state is not None:
+        return state
+    if user.status < StatesUserEnum.FINISH:
+        return FSMState(user.status)
+    return FSMState(StatesUserEnum.FINISH)
+
+
+async def _not_registered(transition: Transition) -> Optional[str]:
+    """Refuse to start registration again."""
+    if transition.user.status >= StatesUserEnum.FINISH:
+        return "Вы уже зарегистрированы"
+    return None
+
+
+async def _task_exists(transition: Transition) -> Optional[str]:
+    """Refuse to edit a task that was deleted or is no longer shared with the user."""
+    if not await Repository.task_exists(transition.user, transition.state.task_id):
+        return "Задача не найдена"
+    return None
+
+
+async def _own_task_exists(transition: Transition) -> Optional[str]:
+    """Refuse to set a reminder on a task of another list member, who would not receive it."""
+    if not await Repository.task_exists(transition.user, transition.state.task_id, own=True):
+        return "Задача не найдена"
+    return None
+
+
+async def _accept_name(transition: Transition) -> Optional[str]:
+    """Remember the entered user name."""
+    if not is_valid_name(transition.text):
+        return "Введенное имя не подходит"
+    transition.state.data["name"] = transition.text
+    return None
+
+
+async def _accept_login(transition: Transition) -> Optional[str]:
+    """Claim the entered login, which also saves the user."""
+    user, text = transition.user, transition.text
+    name = transition.state.data.get("name", user.name)
+    if not (is_valid_login(text) and await Repository.claim_login(user, name, text)):
+        return "Введенный логин не подходит"
+    return None
+
+
+async def _accept_title(transition: Transition) -> Optional[str]:
+    """Remember the entered task title."""
+    transition.state.data["title"] = transition.text
+    return None
+
+
+async def _accept_new_task(transition: Transition) -> Optional[str]:
+    """Create the task from the remembered title and the entered description."""
+    transition.task = Task(
+        user_id=transition.user.id,
+        title=transition.state.data["title"],
+        description=transition.text,
+        is_visible=True
+    )
+    return None
+
+
+async def _accept_task_update(transition: Transition) -> Optional[str]:
+    """Change the task title and description."""
+    transition.task_changes = {"title": transition.state.data["title"], "description": transition.text}
+    return None
+
+
+async def _accept_due_at(transition: Transition) -> Optional[str]:
+    """Remember the entered due date, or none for -."""
+    text = transition.text.strip()
+    due_at = None if text == "-" else parse_datetime(text, datetime.now(timezone.utc))
+    if due_at is None and text != "-":
+        return "Не удалось разобрать дату"
+    transition.state.data["due_at"] = due_at.isoformat() if due_at else None
+    return None
+
+
+async def _accept_remind_at(transition: Transition) -> Optional[str]:
+    """Set the due date and the entered reminder time, or the due date for -. Without a due date - clears both."""
+    now = datetime.now(timezone.utc)
+    due_at = transition.state.data.get("due_at")
+    due_at = datetime.fromisoformat(due_at) if due_at else None
+    if transition.text.strip() == "-" and due_at is None:
+        transition.task_changes = {"due_at": None, "remind_at": None}
+        return None
+    remind_at = due_at if transition.text.strip() == "-" else parse_datetime(transition.text, now)
+    if remind_at is None:
+        return "Не удалось разобрать дату"
+    if remind_at <= now:
+        return "Время напоминания уже прошло"
+    transition.task_changes = {"due_at": due_at, "remind_at": remind_at}
+    return None
+
+
+def _reminder_reply(transition: Transition) -> str:
+    """Confirm the reminder time, or that the due date and reminder were cleared."""
+    remind_at = transition.task_changes["remind_at"]
+    if remind_at is None:
+        return "Срок и напоминание сняты"
+    return f"Напоминание установлено на {remind_at:%Y-%m-%d %H:%M} UTC"
+
+
+def _schedule_reminder(transition: Transition) -> None:
+    """Hand the saved reminder to the scheduler."""
+    if transition.task_changes["remind_at"] is not None:
+        reminder_scheduler.notify(transition.state.task_id, transition.task_changes["remind_at"])
+
+
+TRANSITIONS = {
+    StatesUserEnum.START: Rule(
+        StatesUserEnum.ENTER_NAME, "Введите имя пользователся", accept=_not_registered
+    ),
+    StatesUserEnum.ENTER_NAME: Rule(
+        StatesUserEnum.ENTER_LOGIN, "Введите имя логин", accept=_accept_name
+    ),
+    StatesUserEnum.ENTER_LOGIN: Rule(
+        StatesUserEnum.FINISH, "Поздравляю вы зарегистрировались",
+        accept=_accept_login, buttons=BUTTONS_AFTER_REGISTRATION
+    ),
+    StatesUserEnum.CREATE_TASK_START: Rule(
+        StatesUserEnum.CREATE_TASK_TITLE, "Введите название задачи"
+    ),
+    StatesUserEnum.CREATE_TASK_TITLE: Rule(
+        StatesUserEnum.CREATE_TASK_DESCRIPTION, "Введите описание задачи", accept=_accept_title
+    ),
+    StatesUserEnum.CREATE_TASK_DESCRIPTION: Rule(
+        StatesUserEnum.FINISH, "Задача была создана", accept=_accept_new_task
+    ),
+    StatesUserEnum.UPDATE_TASK_START: Rule(
+        StatesUserEnum.UPDATE_TASK_TITLE, "Введите новое название задачи", accept=_task_exists
+    ),
+    StatesUserEnum.UPDATE_TASK_TITLE: Rule(
+        StatesUserEnum.UPDATE_TASK_DESCRIPTION, "Введите новое описание задачи", accept=_accept_title
+    ),
+    StatesUserEnum.UPDATE_TASK_DESCRIPTION: Rule(
+        StatesUserEnum.FINISH, "Задача была обновлена", accept=_accept_task_update
+    ),
+    StatesUserEnum.REMIND_TASK_START: Rule(
+        StatesUserEnum.REMIND_TASK_DUE,
+        "Введите срок задачи: ГГГГ-ММ-ДД ЧЧ:ММ (UTC), через сколько (30m, 2h, 1d) или - без срока",
+        accept=_own_task_exists
+    ),
+    StatesUserEnum.REMIND_TASK_DUE: Rule(
+        StatesUserEnum.REMIND_TASK_REMIND, "Когда напомнить? Тот же формат или - чтобы напомнить в срок",
+        accept=_accept_due_at
+    ),
+    StatesUserEnum.REMIND_TASK_REMIND: Rule(
+        StatesUserEnum.FINISH, _reminder_reply, accept=_accept_remind_at, on_commit=_schedule_reminder
+    ),
+}
+
+state_machine = StateMachine(TRANSITIONS)
@@ -0,0 +1,134 @@
+import csv
+import json
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, TextIO, Tuple
+
+EXPORT_FIELDS = ("title", "description", "is_complete", "due_at", "remind_at")
+EXPORT_FORMATS = ("jsonl", "csv")
+
+TITLE_MAX_LENGTH = 100
+DESCRIPTION_MAX_LENGTH = 300
+
+TaskRecord = Tuple[str, Optional[str], bool, Optional[datetime], Optional[datetime]]
+
+
+class TaskFileError(ValueError):
+    """
+    Raised for an imported file that cannot be read, with the number of the offending line.
+    """
+
+    def __init__(self, line: int, reason: str) -> None:
+        super().__init__(f"line {line}: {reason}")
+        self.line = line
+        self.reason = reason
+
+
+async def write_tasks(file: TextIO, rows: AsyncIterator[Tuple], file_format: str) -> int:
+    """
+    Write exported task rows to a text file in JSON lines or CSV format, one task per line.
+    Returns the number of tasks written.
+    """
+    count = 0
+    if file_format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(EXPORT_FIELDS)
+        async for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+            count += 1
+    else:
+        async for row in rows:
+            file.write(json.dumps(dict(zip(EXPORT_FIELDS, map(_json_value, row))), ensure_ascii=False))
+            file.write("\n")
+            count += 1
+    return count
+
+
+def read_tasks(file: TextIO, file_format: str, now: datetime) -> Iterator[TaskRecord]:
+    """
+    Read and validate tasks from a file written by write_tasks, one at a time.
+    Reminders in the past are dropped, so imported tasks do not fire stale reminders.
+    """
+    if file_format == "csv":
+        items = _csv_rows(csv.DictReader(file))
+    else:
+        items = _json_lines(file)
+    for line, item in items:
+        yield _task_record(line, item, now)
+
+
+def _csv_rows(reader: csv.DictReader) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    try:
+        if "title" not in (reader.fieldnames or ()):
+            raise TaskFileError(1, "the header must contain a title column")
+        for item in reader:
+            yield reader.line_num, item
+    except csv.Error as e:
+        raise TaskFileError(reader.reader.line_num, f"invalid CSV ({e})")
+
+
+def _json_lines(file: TextIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    for line, text in enumerate(file, start=1):
+        if not text.strip():
+            continue
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise TaskFileError(line, f"invalid JSON ({e.msg})")
+        if not isinstance(item, dict):
+            raise TaskFileError(line, "a task must be a JSON object")
+        yield line, item
+
+
+def _task_record(line: int, item: Dict[str, Any], now: datetime) -> TaskRecord:
+    title = item.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise TaskFileError(line, "title is required")
+    if "\x00" in title:
+        raise TaskFileError(line, "title must not contain NUL characters")
+    if len(title) > TITLE_MAX_LENGTH:
+        raise TaskFileError(line, f"title is longer than {TITLE_MAX_LENGTH} characters")
+    description = item.get("description") or None
+    if description is not None and not isinstance(description, str):
+        raise TaskFileError(line, "description must be text")
+    if description is not None and "\x00" in description:
+        raise TaskFileError(line, "description must not contain NUL characters")
+    if description is not None and len(description) > DESCRIPTION_MAX_LENGTH:
+        raise TaskFileError(line, f"description is longer than {DESCRIPTION_MAX_LENGTH} characters")
+    is_complete = _parse_bool(line, item.get("is_complete"))
+    due_at = _parse_datetime(line, "due_at", item.get("due_at"))
+    remind_at = _parse_datetime(line, "remind_at", item.get("remind_at"))
+    if remind_at is not None and remind_at <= now:
+        remind_at = None
+    return title, description, is_complete, due_at, remind_at
+
+
+def _parse_bool(line: int, value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if value is None or str(value).strip().lower() in ("", "false", "0", "no"):
+        return False
+    if str(value).strip().lower() in ("true", "1", "yes"):
+        return True
+    raise TaskFileError(line, "is_complete must be true or false")
+
+
+def _parse_datetime(line: int, field: str, value: Any) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise TaskFileError(line, f"{field} must be an ISO 8601 date and time")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return _json_value(value)
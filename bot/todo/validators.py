@@ -1,9 +1,30 @@
-from database.repository import Repository
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from database.cache import taken_logins
+
+RELATIVE_TIME = re.compile(r"^(\d{1,4})\s*([mhdw])$")
+RELATIVE_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M", "%Y-%m-%d")
 
 
 def is_valid_name(name: str) -> None:
     return not name.startswith("/")
 
 
-async def is_valid_login(login) -> None:
-    return is_valid_name(login) and not (await Repository.user_exists_by_login(login))
\ No newline at end of file
+def is_valid_login(login) -> None:
+    return is_valid_name(login) and not taken_logins.get(login)
+
+
+def parse_datetime(text: str, now: datetime) -> Optional[datetime]:
+    text = text.strip().lower()
+    match = RELATIVE_TIME.match(text)
+    if match:
+        return now + timedelta(**{RELATIVE_UNITS[match.group(2)]: int(match.group(1))})
+    for date_format in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None